@@ -0,0 +1,103 @@
+import json
+import os
+import sqlite3
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Where fetched articles are kept between runs
+ARTICLE_STORE_PATH = os.getenv("ARTICLE_STORE_PATH", "articles.db")
+ARTICLE_STORE_RETENTION_DAYS = float(os.getenv("ARTICLE_STORE_RETENTION_DAYS", "2")) # Older articles are deleted (never less than the fetch window)
+
+
+class ArticleStore:
+    """Small SQLite store of already fetched Guardian articles, keyed by the Guardian article id."""
+
+    def __init__(self, path=ARTICLE_STORE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                url TEXT NOT NULL,
+                published TEXT NOT NULL,
+                trail_text TEXT NOT NULL DEFAULT '',
+                text TEXT NOT NULL,
+                tags TEXT NOT NULL DEFAULT '[]'
+            );
+            CREATE INDEX IF NOT EXISTS articles_published ON articles (published);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        # Stores created before tags were kept need the column added
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(articles)")}
+        if "tags" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE articles ADD COLUMN tags TEXT NOT NULL DEFAULT '[]'")
+
+    def get_watermark(self):
+        """Returns the newest webPublicationDate seen so far, or None on a fresh store."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'watermark'").fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, published):
+        """Moves the watermark forward (it never goes backwards)."""
+        current = self.get_watermark()
+        if current is not None and published <= current:
+            return
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('watermark', ?)", (published,)
+            )
+
+    def known_ids(self, ids):
+        """Returns the subset of the given article ids that are already stored."""
+        ids = list(ids)
+        known = set()
+        # Stay well under SQLite's limit on query parameters
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(f"SELECT id FROM articles WHERE id IN ({placeholders})", chunk)
+            known.update(row[0] for row in rows)
+        return known
+
+    def add_articles(self, articles):
+        """Saves cleaned article dicts (they must include 'id' and 'published')."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO articles (id, title, url, published, trail_text, text, tags) "
+                "VALUES (:id, :title, :url, :published, :trail_text, :text, :tags)",
+                [{**article, "tags": json.dumps(article.get("tags", []))} for article in articles],
+            )
+
+    def delete_older_than(self, before):
+        """Deletes articles published before 'before' (an ISO date/timestamp) and returns how many went."""
+        with self.conn:
+            return self.conn.execute("DELETE FROM articles WHERE published < ?", (before,)).rowcount
+
+    def recent_articles(self, since, limit=None):
+        """Returns stored articles published at or after 'since', newest first."""
+        query = (
+            "SELECT id, title, url, published, trail_text, text, tags FROM articles "
+            "WHERE published >= ? ORDER BY published DESC"
+        )
+        params = [since]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        rows = self.conn.execute(query, params).fetchall()
+        return [
+            {"id": row[0], "title": row[1], "url": row[2], "published": row[3], "trail_text": row[4], "text": row[5],
+             "tags": json.loads(row[6])}
+            for row in rows
+        ]
+
+    def close(self):
+        self.conn.close()
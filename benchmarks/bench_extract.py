@@ -0,0 +1,88 @@
+"""Micro-benchmark: streaming stdlib HTML extractor vs. BeautifulSoup.
+
+Reports throughput (MB/s of HTML) and peak traced memory for each extractor.
+
+Usage:
+    python benchmarks/bench_extract.py                 # synthetic live-blog sized bodies
+    python benchmarks/bench_extract.py body1.html ...  # your own saved article bodies
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+# Allow running from the repository root or from inside benchmarks/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_text import extract_text_bs4, extract_text_fast
+
+EXTRACTORS = {"fast": extract_text_fast, "bs4": extract_text_bs4}
+
+
+def synthetic_body(blocks):
+    """Builds a Guardian-like live blog body with paragraphs, embeds, figures and scripts."""
+    parts = []
+    for i in range(blocks):
+        parts.append(
+            f'<div class="block" id="block-{i}">'
+            f"<h2>{i}th minute: Goal! Arsenal 1-0 Chelsea</h2>"
+            f'<p>A <a href="https://www.theguardian.com/football/arsenal">fine strike</a> from the edge of the box '
+            f"finds the bottom corner, and the <strong>home crowd</strong> goes wild &amp; loud.</p>"
+            f'<figure class="element element-image"><img src="https://i.guim.co.uk/{i}.jpg" alt="goal">'
+            f"<figcaption>The ball hits the net.</figcaption></figure>"
+            f"<p>Chelsea respond immediately, pressing high and winning a corner that comes to nothing.</p>"
+            f'<figure class="element element-embed"><iframe src="https://twitter.com/embed/{i}"></iframe></figure>'
+            f"<script>window.guardian && window.guardian.track({i});</script>"
+            f"<ul><li>Shots: {i}</li><li>Possession: 55%</li></ul>"
+            f"</div>"
+        )
+    return "".join(parts)
+
+
+def measure(extractor, bodies, repeat):
+    """Returns (MB/s, peak traced bytes) for running 'extractor' over every body 'repeat' times."""
+    total_bytes = sum(len(body.encode("utf-8")) for body in bodies) * repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for body in bodies:
+            extractor(body)
+    elapsed = time.perf_counter() - start
+
+    # Memory is measured on a separate pass so tracing doesn't distort the timing
+    tracemalloc.start()
+    for body in bodies:
+        extractor(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return total_bytes / elapsed / 1e6, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="HTML files to use instead of synthetic bodies")
+    parser.add_argument("--articles", type=int, default=20, help="synthetic bodies to generate")
+    parser.add_argument("--blocks", type=int, default=200, help="live blog blocks per synthetic body")
+    parser.add_argument("--repeat", type=int, default=3, help="timed passes over all bodies")
+    args = parser.parse_args()
+
+    if args.files:
+        bodies = []
+        for path in args.files:
+            with open(path, encoding="utf-8") as f:
+                bodies.append(f.read())
+    else:
+        bodies = [synthetic_body(args.blocks) for _ in range(args.articles)]
+
+    size_mb = sum(len(body.encode("utf-8")) for body in bodies) / 1e6
+    print(f"{len(bodies)} bodies, {size_mb:.2f} MB of HTML, {args.repeat} passes")
+    print(f"{'extractor':<10} {'MB/s':>8} {'peak KiB':>10}")
+    for name, extractor in EXTRACTORS.items():
+        throughput, peak = measure(extractor, bodies, args.repeat)
+        print(f"{name:<10} {throughput:>8.2f} {peak / 1024:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
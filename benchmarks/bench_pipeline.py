@@ -0,0 +1,208 @@
+"""End-to-end benchmark: fetch, summarize and deliver against local stand-ins (see fakes.py).
+
+Nothing leaves the machine: the Guardian, OpenAI and SMTP endpoints are served by a separate
+process, and every store (articles, summary cache, send log) lives in a scratch directory.
+For each size it reports wall time, throughput, p50/p99 latency of the underlying calls and
+peak traced memory, so regressions show up before production does.
+
+    fetch      get_recent_guardian_sports_news(n)   articles/s, latency of one /search page
+    summarize  summarize_articles(n), cold cache     articles/s, latency of one OpenAI request
+    send       send_newsletter() to n recipients     emails/s in the delivery stage, latency of one send
+
+Usage:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --articles 100 1000 10000 --recipients 1 1000 100000
+    python benchmarks/bench_pipeline.py --llm-latency 0.5 --llm-429-ratio 0.05 --batch --json before.json
+
+Tuning settings that aren't set here (DELIVERY_WORKERS, SUMMARY_MAX_WORKERS, ...) are read from
+the environment as usual, so e.g. `DELIVERY_WORKERS=16 python benchmarks/bench_pipeline.py` works.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from contextlib import redirect_stdout
+
+# Allow running from the repository root or from inside benchmarks/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakes
+
+GUARDIAN_PAGE_SIZE = 200
+
+
+def configure_environment(args, workdir, service_env):
+    """Points the newsletter at the stand-ins and the scratch directory (before any of it is imported)."""
+    os.environ.update(service_env)
+    os.environ.update({
+        "ARTICLE_STORE_PATH": os.path.join(workdir, "articles.db"),
+        "SUMMARY_CACHE_PATH": os.path.join(workdir, "summary_cache.db"),
+        "SEND_LOG_PATH": os.path.join(workdir, "send_log.db"),
+        "SUBSCRIBERS_SOURCE": os.path.join(workdir, "subscribers.csv"),
+        "METRICS_JSON_PATH": os.path.join(workdir, "run_report.json"),
+        "PROMETHEUS_TEXTFILE_PATH": "", # Never overwrite a real node_exporter textfile
+        "NEWSLETTER_PROFILE": "",
+        "SENDER_EMAIL": "bench@localhost",
+        "RECIPIENT_EMAIL": "",
+        "GUARDIAN_PAGE_SIZE": str(GUARDIAN_PAGE_SIZE),
+        "GUARDIAN_MAX_PAGES": str(-(-max(args.articles + [args.send_articles]) // GUARDIAN_PAGE_SIZE)),
+        "FETCH_ARTICLES": str(args.send_articles),
+        "OPENAI_REQUESTS_PER_MINUTE": str(args.rpm),
+        "OPENAI_TOKENS_PER_MINUTE": str(args.tpm),
+        "SUMMARY_BATCH_MODE": "true" if args.batch else "false",
+        "EDITION_DEADLINE_SECONDS": "0",
+    })
+
+
+def start_fakes(args):
+    """Runs the stand-ins in their own process, so they don't compete for our GIL or show up in our memory."""
+    config = {
+        "articles": max(args.articles + [args.send_articles]),
+        "paragraphs": args.paragraphs,
+        "llm_latency": args.llm_latency,
+        "llm_slow_ratio": args.llm_slow_ratio,
+        "llm_429_ratio": args.llm_429_ratio,
+        "smtp_defer_ratio": args.smtp_defer_ratio,
+    }
+    env_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=fakes.serve, args=(config, env_queue), daemon=True)
+    process.start()
+    return process, env_queue.get(timeout=30)
+
+
+def new_articles(service_env):
+    """Asks the Guardian stand-in for a fresh set of articles, so no run is served from an earlier run's cache."""
+    url = service_env["GUARDIAN_SEARCH_URL"].rsplit("/", 1)[0] + "/_generation"
+    urllib.request.urlopen(urllib.request.Request(url, method="POST"), timeout=10).read()
+
+
+def write_subscribers(path, count):
+    """Writes 'count' subscribers; every third one has preferences, so personalization is exercised too."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("email,name,preferences\n")
+        for i in range(count):
+            preferences = f"{fakes.TEAMS[i % len(fakes.TEAMS)]};{fakes.SPORTS[i % len(fakes.SPORTS)]}" if i % 3 == 0 else ""
+            f.write(f"reader{i}@example.com,Reader {i},{preferences}\n")
+
+
+def measure(phase, size, func, latency_stage, verbose=False):
+    """Runs func() once and returns (result, row) with timing, latency percentiles and memory for the run."""
+    from metrics import metrics, percentile
+
+    metrics.reset()
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    if verbose:
+        result = func()
+    else:
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            result = func()
+    elapsed = time.perf_counter() - start
+
+    report = metrics.report()
+    with metrics.lock:
+        latencies = sorted(metrics.timings.get(latency_stage, []))
+    row = {
+        "phase": phase,
+        "size": size,
+        "seconds": elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "calls": len(latencies),
+        "peak_mib": tracemalloc.get_traced_memory()[1] / 2**20 if tracemalloc.is_tracing() else None,
+        "max_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, # ru_maxrss is KiB on Linux
+        "counters": report["counters"],
+        "stages": {stage: stats["total_seconds"] for stage, stats in report["stages"].items()},
+    }
+    return result, row
+
+
+def print_row(row, throughput, unit):
+    peak = f"{row['peak_mib']:.1f}" if row["peak_mib"] is not None else "-"
+    print(f"{row['phase']:<10} {row['size']:>7} {row['seconds']:>9.2f} {throughput:>10.1f} {unit:<11} "
+          f"{row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f} {peak:>9} {row['max_rss_mib']:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, nargs="+", default=[100, 1000], help="article counts to fetch and summarize")
+    parser.add_argument("--recipients", type=int, nargs="+", default=[1, 1000], help="recipient counts to send to")
+    parser.add_argument("--send-articles", type=int, default=200, help="articles each send run looks at (FETCH_ARTICLES)")
+    parser.add_argument("--paragraphs", type=int, default=8, help="paragraphs per article body (~1.3 KB each)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds the OpenAI stand-in takes per request")
+    parser.add_argument("--llm-slow-ratio", type=float, default=0.0, help="share of OpenAI requests that take 10x as long")
+    parser.add_argument("--llm-429-ratio", type=float, default=0.0, help="share of OpenAI requests answered with 429")
+    parser.add_argument("--smtp-defer-ratio", type=float, default=0.0, help="share of recipients answered with 451")
+    parser.add_argument("--rpm", type=int, default=1_000_000, help="OPENAI_REQUESTS_PER_MINUTE (default: no real limit)")
+    parser.add_argument("--tpm", type=int, default=1_000_000_000, help="OPENAI_TOKENS_PER_MINUTE (default: no real limit)")
+    parser.add_argument("--batch", action="store_true", help="summarize in batch mode (SUMMARY_BATCH_MODE)")
+    parser.add_argument("--phases", nargs="+", choices=["fetch", "summarize", "send"], default=["fetch", "summarize", "send"])
+    parser.add_argument("--no-tracemalloc", action="store_true", help="skip memory tracing (faster; max RSS is still reported)")
+    parser.add_argument("--json", help="also write the results to this file, e.g. to compare before/after a change")
+    parser.add_argument("--verbose", action="store_true", help="show the newsletter's own output")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="newsletter-bench-")
+    fakes_process, service_env = start_fakes(args)
+    configure_environment(args, workdir, service_env)
+
+    # Only now that the environment is set up can the newsletter modules be imported
+    from fetch_news import get_recent_guardian_sports_news
+    from send_email import send_newsletter
+    from summarizer import summarize_articles
+
+    if not args.no_tracemalloc:
+        tracemalloc.start()
+    print(f"Scratch directory: {workdir}")
+    print(f"{'phase':<10} {'size':>7} {'seconds':>9} {'throughput':>10} {'':<11} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'peak MiB':>9} {'RSS MiB':>8}")
+
+    rows = []
+    try:
+        for count in sorted(args.articles):
+            new_articles(service_env)
+            articles = []
+            if "fetch" in args.phases or "summarize" in args.phases:
+                articles, row = measure(
+                    "fetch", count,
+                    lambda: get_recent_guardian_sports_news(max_articles=count, page_size=GUARDIAN_PAGE_SIZE,
+                                                            max_pages=-(-count // GUARDIAN_PAGE_SIZE), use_store=False),
+                    "fetch_page", args.verbose,
+                )
+                if "fetch" in args.phases:
+                    rows.append(row)
+                    print_row(row, len(articles) / row["seconds"], "articles/s")
+            if "summarize" in args.phases:
+                summaries, row = measure("summarize", count, lambda: summarize_articles(articles), "openai_call", args.verbose)
+                rows.append(row)
+                print_row(row, len(summaries) / row["seconds"], "articles/s")
+
+        if "send" in args.phases:
+            for count in sorted(args.recipients):
+                new_articles(service_env)
+                write_subscribers(os.environ["SUBSCRIBERS_SOURCE"], count)
+                edition = f"bench-{count}-{time.time():.0f}"
+                _, row = measure("send", count, lambda: send_newsletter(edition=edition), "smtp_send", args.verbose)
+                rows.append(row)
+                sent = row["counters"].get("emails_sent", 0)
+                print_row(row, sent / max(row["stages"].get("stage_deliver", 0), 1e-9), "emails/s")
+                if sent < count:
+                    print(f"  only {sent} of {count} emails were sent ({row['counters'].get('emails_failed', 0)} failed)")
+    finally:
+        fakes_process.terminate()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Local stand-ins for the Guardian, OpenAI and SMTP services, for benchmarks.
+
+Everything here is stdlib only and deliberately simple: the point is to take the network
+services out of the measurement, not to emulate them faithfully.
+
+    python benchmarks/fakes.py --articles 5000 --llm-latency 0.2
+
+starts all three and prints the environment variables that point the newsletter at them.
+"""
+import argparse
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TEAMS = [
+    "Arsenal", "Chelsea", "Liverpool", "Manchester United", "Manchester City", "Tottenham", "Newcastle",
+    "Aston Villa", "England", "Ireland", "Wales", "Scotland", "Ferrari", "Red Bull", "Mercedes", "McLaren",
+]
+SPORTS = ["Football", "Cricket", "Rugby union", "Formula One", "Tennis", "Golf", "Cycling", "Boxing"]
+WORDS = (
+    "match season goal win defeat draw injury transfer manager coach captain squad league cup final title "
+    "points table striker midfielder defender keeper penalty corner innings wicket try scrum lap pole podium "
+    "set serve break round stage sprint knockout fans stadium record contract debut return form"
+).split()
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, payload, headers=()):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class GuardianHandler(JSONHandler):
+    """Serves /search like the Guardian Content API: newest first, paginated, with body and tags.
+
+    Articles are generated from their index, so every request for the same page returns the
+    same results. POST /_generation starts a fresh set of articles (new ids and text), so a
+    benchmark can defeat the article store and summary cache between runs.
+    """
+
+    articles = 1000
+    paragraphs = 8
+    generation = 0
+    started = datetime.now(timezone.utc)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/_generation":
+            self.send_json(404, {"message": "Not found"})
+            return
+        type(self).generation += 1
+        self.send_json(200, {"generation": self.generation})
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/search":
+            self.send_json(404, {"message": "Not found"})
+            return
+        query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        page_size = int(query.get("page-size", 10))
+        page = int(query.get("page", 1))
+        pages = max(1, -(-self.articles // page_size))
+        if page > pages:
+            self.send_json(400, {"message": "requested page is beyond the number of available pages"})
+            return
+        results = [self.article(i) for i in range((page - 1) * page_size, min(page * page_size, self.articles))]
+        self.send_json(200, {"response": {
+            "status": "ok", "total": self.articles, "pages": pages, "currentPage": page, "results": results,
+        }})
+
+    def article(self, i):
+        rng = random.Random(f"{self.generation}:{i}")
+        team, rival = rng.sample(TEAMS, 2)
+        sport = rng.choice(SPORTS)
+        title = f"{team} {rng.choice(WORDS)} {rng.choice(WORDS)} against {rival} ({self.generation}-{i})"
+        body = "".join(
+            f"<p>{' '.join(rng.choices(WORDS, k=40))}. <a href=\"https://www.theguardian.com/{i}\">{team}</a> "
+            f"{' '.join(rng.choices(WORDS, k=20))}.</p>"
+            for _ in range(self.paragraphs)
+        )
+        published = self.started - timedelta(seconds=i * 5)
+        return {
+            "id": f"sport/{self.generation}/article-{i}",
+            "webTitle": title,
+            "webUrl": f"https://www.theguardian.com/sport/{self.generation}/article-{i}",
+            "webPublicationDate": published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "fields": {"trailText": f"{sport}: {' '.join(rng.choices(WORDS, k=12))}", "body": body},
+            "tags": [{"id": name.lower().replace(" ", "-"), "webTitle": name} for name in (sport, team, rival)],
+        }
+
+
+class OpenAIHandler(JSONHandler):
+    """Answers /v1/chat/completions after 'latency' seconds, with a 429 for a 'rate_limit_ratio' share of requests.
+
+    A 'slow_ratio' share of requests takes ten times as long, to give the latency a tail.
+
+    Batch requests (response_format=json_object) get one summary per '[index]' article in the prompt.
+    """
+
+    latency = 0.1
+    slow_ratio = 0.0
+    rate_limit_ratio = 0.0
+    retry_after = 0.5
+
+    def do_GET(self):
+        self.send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.latency * (10 if random.random() < self.slow_ratio else 1))
+        if random.random() < self.rate_limit_ratio:
+            self.send_json(429, {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                           headers=[("retry-after", str(self.retry_after))])
+            return
+
+        prompt = request["messages"][-1]["content"]
+        if request.get("response_format"):
+            indexes = [int(index) for index in re.findall(r"^\[(\d+)\]$", prompt, re.M)]
+            content = json.dumps({"summaries": [
+                {"index": index, "summary": f"Summary {index}: {' '.join(random.choices(WORDS, k=30))}."}
+                for index in indexes
+            ]})
+        else:
+            content = f"Summary: {' '.join(random.choices(WORDS, k=30))}."
+        prompt_tokens = sum(len(message["content"]) for message in request["messages"]) // 4
+        self.send_json(200, {
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": int(time.time()), "model": request.get("model", ""),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 60, "total_tokens": prompt_tokens + 60},
+        })
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Accepts and discards mail, answering RCPT with a 451 for a 'defer_ratio' share of recipients."""
+
+    defer_ratio = 0.0
+
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        self.reply("220 sink ESMTP ready")
+        for line in self.rfile:
+            command = line.decode("ascii", "replace").strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250-sink")
+                self.reply("250-8BITMIME")
+                self.reply("250 SIZE 52428800")
+            elif command.startswith("RCPT"):
+                self.reply("451 4.3.0 Try again later" if random.random() < self.defer_ratio else "250 2.1.5 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                for data_line in self.rfile:
+                    if data_line == b".\r\n":
+                        break
+                self.reply("250 2.0.0 Queued")
+            elif command == "QUIT":
+                self.reply("221 2.0.0 Bye")
+                return
+            else: # MAIL, RSET, NOOP
+                self.reply("250 2.0.0 OK")
+
+
+class SMTPSinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_servers(articles=1000, paragraphs=8, llm_latency=0.1, llm_slow_ratio=0.0, llm_429_ratio=0.0,
+                  smtp_defer_ratio=0.0):
+    """Starts all three stand-ins on free localhost ports, serving from daemon threads.
+
+    Returns the environment variables that point the newsletter at them.
+    """
+    guardian = type("Guardian", (GuardianHandler,), {"articles": articles, "paragraphs": paragraphs})
+    openai = type("OpenAI", (OpenAIHandler,), {
+        "latency": llm_latency, "slow_ratio": llm_slow_ratio, "rate_limit_ratio": llm_429_ratio,
+    })
+    smtp = type("SMTPSink", (SMTPSinkHandler,), {"defer_ratio": smtp_defer_ratio})
+
+    servers = [
+        ThreadingHTTPServer(("127.0.0.1", 0), guardian),
+        ThreadingHTTPServer(("127.0.0.1", 0), openai),
+        SMTPSinkServer(("127.0.0.1", 0), smtp),
+    ]
+    for server in servers:
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    guardian_port, openai_port, smtp_port = (server.server_address[1] for server in servers)
+    return {
+        "GUARDIAN_SEARCH_URL": f"http://127.0.0.1:{guardian_port}/search",
+        "GUARDIAN_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+        "OPENAI_API_KEY": "bench",
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(smtp_port),
+        "SMTP_USE_SSL": "false",
+        "SMTP_AUTH": "false",
+    }
+
+
+def serve(config, env_queue):
+    """Process entry point: starts the servers, reports their environment, then runs until killed."""
+    env_queue.put(start_servers(**config))
+    threading.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=1000, help="articles the Guardian stand-in has")
+    parser.add_argument("--paragraphs", type=int, default=8, help="paragraphs per article body (~1.3 KB each)")
+    parser.add_argument("--llm-latency", type=float, default=0.1, help="seconds per OpenAI request")
+    parser.add_argument("--llm-slow-ratio", type=float, default=0.0, help="share of OpenAI requests that take 10x as long")
+    parser.add_argument("--llm-429-ratio", type=float, default=0.0, help="share of OpenAI requests answered with 429")
+    parser.add_argument("--smtp-defer-ratio", type=float, default=0.0, help="share of recipients answered with 451")
+    args = parser.parse_args()
+
+    env = start_servers(args.articles, args.paragraphs, args.llm_latency, args.llm_slow_ratio, args.llm_429_ratio,
+                        args.smtp_defer_ratio)
+    for name, value in env.items():
+        print(f"export {name}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
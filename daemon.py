@@ -0,0 +1,164 @@
+import argparse
+import os
+import signal
+import threading
+from datetime import datetime, time as dt_time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Comma-separated 'HH:MM[@Timezone]' entries, e.g. "07:00@Europe/London, 18:30@Europe/London, 07:00@America/New_York".
+# An entry only goes to the subscribers in its timezone (their 'timezone' column, see delivery.load_subscribers);
+# subscribers without one, or with a timezone that has no entries, get the editions of the default timezone.
+EDITION_SCHEDULE = os.getenv("EDITION_SCHEDULE", "07:00")
+DAEMON_TIMEZONE = os.getenv("DAEMON_TIMEZONE", "UTC") # Used for entries without an explicit timezone
+
+
+def parse_schedule(spec, default_timezone=DAEMON_TIMEZONE):
+    """Turns '07:00, 18:30@Europe/London' into a list of (time, ZoneInfo) entries."""
+    schedule = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        clock, _, zone = entry.partition("@")
+        hour, _, minute = clock.partition(":")
+        schedule.append((dt_time(int(hour), int(minute or 0)), ZoneInfo(zone.strip() or default_timezone)))
+    if not schedule:
+        raise ValueError(f"No editions scheduled in {spec!r}")
+    return schedule
+
+
+def next_run(schedule, now=None):
+    """Returns (run_at, edition_id) for the soonest scheduled edition strictly after 'now'."""
+    now = now or datetime.now(timezone.utc)
+    runs = []
+    for clock, zone in schedule:
+        local_now = now.astimezone(zone)
+        for days_ahead in (0, 1):
+            # Building the datetime from the local date keeps the wall-clock time right across DST changes
+            run_at = datetime.combine(local_now.date() + timedelta(days=days_ahead), clock, tzinfo=zone)
+            if run_at > local_now:
+                edition = f"{run_at.date().isoformat()}-{clock.strftime('%H%M')}-{zone.key}"
+                runs.append((run_at, edition))
+                break
+    return min(runs, key=lambda run: run[0])
+
+
+def edition_audience(schedule, zone, default_timezone=DAEMON_TIMEZONE):
+    """Returns an audience(subscriber) check for the editions scheduled in 'zone'.
+
+    Subscribers get the editions of their own timezone when it has entries in the schedule.
+    Everyone else gets those of 'default_timezone', or of the first entry's timezone if the
+    default has no entries, so each subscriber gets each daily slot exactly once.
+    """
+    zones = {entry_zone.key for _, entry_zone in schedule}
+    fallback = default_timezone if default_timezone in zones else schedule[0][1].key
+
+    def audience(subscriber):
+        subscriber_zone = (subscriber.get("timezone") or "").strip()
+        return (subscriber_zone if subscriber_zone in zones else fallback) == zone.key
+
+    return audience
+
+
+class NewsletterDaemon:
+    """Sends scheduled editions from one long-running process.
+
+    Imports, the Guardian/OpenAI HTTP clients, the SMTP connection pool and the summary cache
+    stay warm between editions, so each edition only pays for the work itself.
+    SIGHUP re-reads .env for the schedule and the SMTP server settings, and recycles SMTP
+    connections; every other setting is read once at startup, so changing it needs a restart.
+    SIGTERM/SIGINT stop the daemon once any edition in progress has finished.
+    """
+
+    def __init__(self, schedule_spec=None):
+        self.schedule_spec = schedule_spec # A schedule given on the command line wins over .env, also on reload
+        self.schedule = parse_schedule(schedule_spec or EDITION_SCHEDULE)
+        self.default_timezone = DAEMON_TIMEZONE
+        self.wake = threading.Event()
+        self.stopping = False
+        self.reload_requested = False
+
+        # Imported here rather than at the top so `--help` and schedule errors stay instant
+        from delivery import SendLog, SMTPConnectionPool
+        from send_email import send_newsletter
+
+        self.send_newsletter = send_newsletter
+        self.make_smtp_pool = SMTPConnectionPool
+        self.smtp_pool = SMTPConnectionPool()
+        self.send_log = SendLog()
+
+    def request_stop(self, signum, frame):
+        print(f"Received signal {signum}; stopping after the current edition.")
+        self.stopping = True
+        self.wake.set()
+
+    def request_reload(self, signum, frame):
+        print("Received SIGHUP; reloading configuration.")
+        self.reload_requested = True
+        self.wake.set()
+
+    def reload(self):
+        """Re-reads the schedule and SMTP server settings from .env, and swaps in fresh SMTP connections."""
+        self.reload_requested = False
+        load_dotenv(override=True)
+        default_timezone = os.getenv("DAEMON_TIMEZONE", DAEMON_TIMEZONE)
+        try:
+            self.schedule = parse_schedule(self.schedule_spec or os.getenv("EDITION_SCHEDULE", EDITION_SCHEDULE),
+                                           default_timezone)
+            self.default_timezone = default_timezone
+        except ValueError as e:
+            print(f"Keeping the previous schedule: {e}")
+        old_pool = self.smtp_pool
+        self.smtp_pool = self.make_smtp_pool.from_environment()
+        old_pool.close()
+
+    def run_edition(self, edition, zone=None):
+        """Sends one edition: to the subscribers of 'zone' (a scheduled timezone), or to everyone without one."""
+        print(f"=== Edition {edition} ===")
+        audience = edition_audience(self.schedule, zone, self.default_timezone) if zone is not None else None
+        try:
+            self.send_newsletter(edition=edition, smtp_pool=self.smtp_pool, send_log=self.send_log, audience=audience)
+        except Exception as e:
+            # One bad edition shouldn't take the daemon down
+            print(f"Edition {edition} failed: {e}")
+
+    def run(self, run_now=False):
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self.request_reload)
+
+        try:
+            if run_now:
+                self.run_edition(datetime.now(timezone.utc).strftime("%Y-%m-%d-%H%M-manual"))
+            while not self.stopping:
+                self.wake.clear()
+                if self.reload_requested:
+                    self.reload()
+                run_at, edition = next_run(self.schedule)
+                print(f"Next edition {edition} at {run_at.isoformat()}")
+                # Sleep in short steps so clock changes and signals are noticed promptly
+                while not (self.stopping or self.reload_requested):
+                    remaining = (run_at - datetime.now(timezone.utc)).total_seconds()
+                    if remaining <= 0:
+                        break
+                    self.wake.wait(min(remaining, 60))
+                if self.stopping or self.reload_requested:
+                    continue
+                self.run_edition(edition, run_at.tzinfo)
+        finally:
+            self.smtp_pool.close()
+            self.send_log.close()
+            print("Newsletter daemon stopped.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send the newsletter on a schedule from one long-running process.")
+    parser.add_argument("--schedule", help="override EDITION_SCHEDULE, e.g. '07:00@Europe/London,18:00@Europe/London'")
+    parser.add_argument("--run-now", action="store_true", help="send one edition immediately, then follow the schedule")
+    args = parser.parse_args()
+    NewsletterDaemon(args.schedule).run(run_now=args.run_now)
@@ -0,0 +1,131 @@
+import os
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Articles whose estimated Jaccard similarity (over their key terms, see key_terms) reaches this are treated as one story
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.25"))
+DEDUP_MAX_CHARS = 2000  # Only the start of each article is compared; the opening says what the story is
+NUM_PERM = 128  # MinHash signature length
+MAX_HASH = (1 << 32) - 1
+MERSENNE_PRIME = (1 << 61) - 1
+
+# Fixed seed so signatures are comparable between runs
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+
+TOKEN_RE = re.compile(r"\w[\w'-]*")
+# Capitalised only because they start a sentence (or a quote), so they say nothing about the story
+STOP_WORDS = frozenset(
+    "a after an and as at before but by during for from he her his i if in into it its me my no not of on or our "
+    "she so that the their then there they this to was we were what when where while who with you".split()
+)
+
+
+def key_terms(text):
+    """Returns the hashed key terms of 'text': its names and numbers (capitalised or numeric words).
+
+    A live blog, a match report and a reaction piece on the same game are written separately,
+    so they share few runs of words, but they name the same teams, players, venue and score.
+    """
+    terms = set()
+    for token in TOKEN_RE.findall(text):
+        if token[0].isupper() or token[0].isdigit():
+            token = token.lower()
+            if token not in STOP_WORDS:
+                terms.add(zlib.crc32(token.encode("utf-8")))
+    return terms
+
+
+def minhash_signature(shingle_hashes):
+    """Computes the MinHash signature of a set of shingle hashes in one vectorised pass."""
+    if not shingle_hashes:
+        return np.full(NUM_PERM, MAX_HASH, dtype=np.uint64)
+    hashes = np.fromiter(shingle_hashes, dtype=np.uint64, count=len(shingle_hashes))
+    # (a * h + b) mod p for every permutation/shingle pair, then the minimum per permutation
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % MERSENNE_PRIME & MAX_HASH
+    return permuted.min(axis=1)
+
+
+def lsh_parameters(threshold, num_perm=NUM_PERM):
+    """Picks (bands, rows) so that the LSH S-curve crosses 50% close to 'threshold'."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+def find_duplicate_groups(texts, threshold=DEDUP_THRESHOLD):
+    """Groups texts about the same story together.
+
+    Returns a list of groups (lists of indexes, in input order). Candidate pairs come from an
+    LSH index over MinHash signatures, so the work grows roughly linearly with the number of
+    texts instead of comparing every pair.
+    """
+    term_sets = [key_terms(text) for text in texts]
+    signatures = [minhash_signature(terms) for terms in term_sets]
+    bands, rows = lsh_parameters(threshold)
+
+    # Union-find over article indexes
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for i, signature in enumerate(signatures):
+            if not term_sets[i]:
+                continue # Nothing to compare on; every empty set would look identical
+            buckets[signature[band * rows:(band + 1) * rows].tobytes()].append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            first = members[0]
+            for other in members[1:]:
+                if find(first) == find(other):
+                    continue
+                # LSH only proposes candidates; check the estimated similarity before merging
+                if np.mean(signatures[first] == signatures[other]) >= threshold:
+                    root_a, root_b = find(first), find(other)
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    groups = defaultdict(list)
+    for i in range(len(texts)):
+        groups[find(i)].append(i)
+    return sorted(groups.values(), key=lambda group: group[0])
+
+
+def deduplicate_articles(articles, threshold=DEDUP_THRESHOLD):
+    """Collapses articles on the same story into one representative each.
+
+    The first article of each group (in input order) is kept, and the others are attached
+    to it as 'related' links. Returns new article dicts; the input is left unchanged.
+    """
+    texts = [f"{article.get('title', '')}\n{article.get('trail_text', '')}\n{article.get('text', '')[:DEDUP_MAX_CHARS]}"
+             for article in articles]
+    deduplicated = []
+    for group in find_duplicate_groups(texts, threshold):
+        representative = dict(articles[group[0]])
+        representative["related"] = list(representative.get("related", [])) + [
+            {"title": articles[i].get("title", "No Title"), "url": articles[i].get("url", "#")}
+            for i in group[1:]
+        ]
+        deduplicated.append(representative)
+
+    if len(deduplicated) < len(articles):
+        print(f"Collapsed {len(articles)} articles into {len(deduplicated)} stories.")
+    return deduplicated
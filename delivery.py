@@ -0,0 +1,337 @@
+import os
+import queue
+import smtplib
+import sqlite3
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+from metrics import metrics
+from resilience import CircuitBreaker, CircuitOpenError, backoff_delay
+
+# Load email credentials and delivery settings from .env
+load_dotenv()
+
+# --- SMTP configuration ---
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com") # Example for Gmail
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465")) # Example port for SSL (Gmail)
+SMTP_USE_SSL = os.getenv("SMTP_USE_SSL", "true").lower() in ("1", "true", "yes")
+SMTP_AUTH = os.getenv("SMTP_AUTH", "true").lower() in ("1", "true", "yes") # Set to false for a local test server
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+SENDER_EMAIL = os.getenv("SENDER_EMAIL")
+APP_PASSWORD = os.getenv("APP_PASSWORD")  # Gmail app password or service-specific password
+
+# --- Delivery settings ---
+SUBSCRIBERS_SOURCE = os.getenv("SUBSCRIBERS_SOURCE") # Text/CSV file or SQLite database of subscribers
+SEND_LOG_PATH = os.getenv("SEND_LOG_PATH", "send_log.db")
+DELIVERY_WORKERS = int(os.getenv("DELIVERY_WORKERS", "4")) # Parallel SMTP connections
+MAX_MESSAGES_PER_CONNECTION = int(os.getenv("MAX_MESSAGES_PER_CONNECTION", "100")) # Reconnect after this many
+DELIVERY_MAX_RETRIES = int(os.getenv("DELIVERY_MAX_RETRIES", "3"))
+SMTP_IDLE_CHECK_SECONDS = float(os.getenv("SMTP_IDLE_CHECK_SECONDS", "30")) # Ping connections idle longer than this before reuse
+
+
+def load_subscribers(source=SUBSCRIBERS_SOURCE, fallback=None):
+    """Reads the subscriber list.
+
+    'source' can be a SQLite database (.db/.sqlite, with a 'subscribers' table that has at
+    least an 'email' column, and optionally 'name', 'preferences' and 'timezone') or a text/CSV
+    file with one 'email[,name[,preferences[,timezone]]]' per line, where preferences are
+    separated by ';' (e.g. 'fan@example.com,Sam,football;arsenal;lewis hamilton,Europe/London').
+    The timezone picks which scheduled edition a subscriber gets (see daemon.py). Without a
+    source, the comma-separated 'fallback' string (e.g. RECIPIENT_EMAIL) is used.
+    Returns a list of dicts with at least an 'email' key.
+    """
+    if not source:
+        return [{"email": email.strip()} for email in (fallback or "").split(",") if email.strip()]
+
+    if source.endswith((".db", ".sqlite", ".sqlite3")):
+        conn = sqlite3.connect(source)
+        conn.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in conn.execute("SELECT * FROM subscribers")]
+        finally:
+            conn.close()
+
+    subscribers = []
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            email, name, preferences, zone = (line.split(",", 3) + ["", "", ""])[:4]
+            if email.strip().lower() == "email":
+                continue # Header row of a CSV export
+            subscribers.append({"email": email.strip(), "name": name.strip(), "preferences": preferences.strip(),
+                                "timezone": zone.strip()})
+    return subscribers
+
+
+class SendLog:
+    """Remembers who has already received each edition, so a crashed send can resume where it stopped."""
+
+    def __init__(self, path=SEND_LOG_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sends (
+                edition TEXT NOT NULL,
+                recipient TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                updated REAL NOT NULL,
+                PRIMARY KEY (edition, recipient)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def sent_recipients(self, edition):
+        """Returns the recipients that already got this edition."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT recipient FROM sends WHERE edition = ? AND status = 'sent'", (edition,)
+            )
+            return {row[0] for row in rows}
+
+    def record(self, edition, recipient, status, error=None):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sends (edition, recipient, status, error, updated) VALUES (?, ?, ?, ?, ?)",
+                (edition, recipient, status, error, time.time()),
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+class SMTPConnectionPool:
+    """A pool of authenticated SMTP connections that are reused between messages.
+
+    Each connection is replaced after max_messages sends, since many providers limit
+    how many messages one session may carry.
+    """
+
+    def __init__(self, size=DELIVERY_WORKERS, host=SMTP_SERVER, port=SMTP_PORT, use_ssl=SMTP_USE_SSL,
+                 username=SENDER_EMAIL, password=APP_PASSWORD, auth=SMTP_AUTH,
+                 max_messages=MAX_MESSAGES_PER_CONNECTION, timeout=SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.username = username
+        self.password = password
+        self.auth = auth
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.idle = queue.LifoQueue() # Most recently used first, so warm connections are preferred
+        self.slots = threading.BoundedSemaphore(size)
+
+    @classmethod
+    def from_environment(cls):
+        """A pool built from the current environment rather than the settings read at import time.
+
+        Used by the daemon after SIGHUP, so a changed server, port, password or timeout takes
+        effect. SENDER_EMAIL (the login and From address) still needs a restart.
+        """
+        def flag(name, default):
+            return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+        return cls(
+            size=int(os.getenv("DELIVERY_WORKERS", str(DELIVERY_WORKERS))),
+            host=os.getenv("SMTP_SERVER", SMTP_SERVER),
+            port=int(os.getenv("SMTP_PORT", str(SMTP_PORT))),
+            use_ssl=flag("SMTP_USE_SSL", "true" if SMTP_USE_SSL else "false"),
+            password=os.getenv("APP_PASSWORD", APP_PASSWORD),
+            auth=flag("SMTP_AUTH", "true" if SMTP_AUTH else "false"),
+            max_messages=int(os.getenv("MAX_MESSAGES_PER_CONNECTION", str(MAX_MESSAGES_PER_CONNECTION))),
+            timeout=float(os.getenv("SMTP_TIMEOUT", str(SMTP_TIMEOUT))),
+        )
+
+    def _connect(self):
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        metrics.increment("smtp_connections_opened")
+        server = smtp_class(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.auth:
+                if not self.use_ssl:
+                    # Upgrade a plain connection (e.g. port 587) before the password goes over it
+                    server.ehlo()
+                    server.starttls(context=ssl.create_default_context())
+                    server.ehlo()
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        server.messages_sent = 0
+        server.last_used = time.monotonic()
+        return server
+
+    def _discard(self, server):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    @contextmanager
+    def connection(self):
+        """Lends out a connection; it goes back to the pool unless an error broke it."""
+        with self.slots:
+            server = self._take_idle() or self._connect()
+            try:
+                yield server
+            except Exception as e:
+                if is_connection_error(e):
+                    # The session is gone; don't hand it to anyone else
+                    self._discard(server)
+                else:
+                    self.idle.put(server)
+                raise
+            if server.messages_sent >= self.max_messages:
+                self._discard(server)
+            else:
+                server.last_used = time.monotonic()
+                self.idle.put(server)
+
+    def _take_idle(self):
+        """Returns a pooled connection that is still alive, or None if there isn't one."""
+        while True:
+            try:
+                server = self.idle.get_nowait()
+            except queue.Empty:
+                return None
+            # Servers drop quiet sessions (e.g. between a daemon's editions), so check before reusing
+            if time.monotonic() - getattr(server, "last_used", 0) < SMTP_IDLE_CHECK_SECONDS:
+                return server
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except Exception:
+                pass
+            self._discard(server)
+
+    def close(self):
+        """Closes every idle connection."""
+        while True:
+            try:
+                self._discard(self.idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+def is_connection_error(error):
+    """True if the SMTP session itself failed (as opposed to the server rejecting one message)."""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    # smtplib's own exceptions subclass OSError too, so only count plain socket errors here
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def is_transient(error):
+    """True for temporary SMTP failures (4xx replies, dropped connections) worth retrying."""
+    if is_connection_error(error):
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return False
+
+
+# Once the server keeps dropping or refusing connections, stop trying instead of timing out per recipient
+smtp_breaker = CircuitBreaker("SMTP", is_failure=is_connection_error)
+
+
+def send_one(pool, message, recipient, from_addr=SENDER_EMAIL, max_retries=DELIVERY_MAX_RETRIES):
+    """Sends one message, retrying transient failures with exponential backoff and jitter.
+
+    Raises CircuitOpenError without trying if the SMTP server has been failing.
+    """
+    def attempt_send():
+        with metrics.timer("smtp_send"), pool.connection() as server:
+            server.send_message(message, from_addr=from_addr, to_addrs=[recipient])
+            server.messages_sent += 1
+
+    for attempt in range(max_retries + 1):
+        try:
+            smtp_breaker.call(attempt_send)
+            return
+        except smtplib.SMTPAuthenticationError:
+            raise # Retrying won't fix bad credentials
+        except Exception as e:
+            if attempt == max_retries or not is_transient(e):
+                raise
+            metrics.increment("smtp_retries")
+            time.sleep(backoff_delay(attempt, cap=30))
+
+
+def deliver(edition, subscribers, build_message, workers=DELIVERY_WORKERS, pool=None, send_log=None):
+    """Sends each subscriber their own copy of an edition over a pool of SMTP connections.
+
+    'build_message(subscriber)' returns the email.message.Message for one subscriber.
+    Recipients already marked as sent for this edition in the send log are skipped, so
+    re-running after a crash only sends to the people who were missed.
+    Returns a dict of counts: sent, skipped, failed.
+    """
+    own_pool = pool is None
+    own_log = send_log is None
+    pool = pool or SMTPConnectionPool(size=workers)
+    send_log = send_log or SendLog()
+    counts = {"sent": 0, "skipped": 0, "failed": 0}
+    counts_lock = threading.Lock()
+
+    already_sent = send_log.sent_recipients(edition)
+    pending = queue.Queue()
+    for subscriber in subscribers:
+        if subscriber["email"] in already_sent:
+            counts["skipped"] += 1
+        else:
+            pending.put(subscriber)
+    if counts["skipped"]:
+        print(f"Skipping {counts['skipped']} recipients who already received edition {edition}.")
+
+    fatal_errors = []
+
+    def worker():
+        while not fatal_errors:
+            try:
+                subscriber = pending.get_nowait()
+            except queue.Empty:
+                return
+            recipient = subscriber["email"]
+            try:
+                send_one(pool, build_message(subscriber), recipient)
+                send_log.record(edition, recipient, "sent")
+                outcome = "sent"
+            except (smtplib.SMTPAuthenticationError, CircuitOpenError) as e:
+                # Every other send would fail the same way, so stop the whole run; the send log lets
+                # the next run of this edition pick up where this one stopped
+                fatal_errors.append(e)
+                return
+            except Exception as e:
+                print(f"Failed to send to {recipient}: {e}")
+                send_log.record(edition, recipient, "failed", str(e))
+                outcome = "failed"
+            with counts_lock:
+                counts[outcome] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(max(1, min(workers, pending.qsize())))]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        if own_pool:
+            pool.close()
+        if own_log:
+            send_log.close()
+
+    for outcome, count in counts.items():
+        metrics.increment(f"emails_{outcome}", count)
+    if fatal_errors:
+        if isinstance(fatal_errors[0], CircuitOpenError):
+            print(f"Stopped delivery of edition {edition}: {fatal_errors[0]}. Run it again to reach the remaining recipients.")
+        raise fatal_errors[0]
+    return counts
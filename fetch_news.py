@@ -1,56 +1,206 @@
-import requests
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
+from article_store import ARTICLE_STORE_RETENTION_DAYS, ArticleStore
+from html_text import html_to_text
+from metrics import metrics
+from resilience import DeadlineExceeded, Hedger, backoff_delay, current_deadline
 # All this is imported libraries that help with the script.
 # Load environment variables
 load_dotenv()
 API_KEY = os.getenv("GUARDIAN_API_KEY")
+GUARDIAN_SEARCH_URL = os.getenv("GUARDIAN_SEARCH_URL", "https://content.guardianapis.com/search") # Point at a local stand-in for benchmarks
+
+# Fetch settings (can be overridden in .env or per call)
+PAGE_SIZE = int(os.getenv("GUARDIAN_PAGE_SIZE", "50"))  # Guardian allows up to 200 results per page
+MAX_CONCURRENCY = int(os.getenv("GUARDIAN_MAX_CONCURRENCY", "4"))  # Pages fetched in parallel
+MAX_PAGES = int(os.getenv("GUARDIAN_MAX_PAGES", "10"))  # Upper bound on pages read per run
+GUARDIAN_TIMEOUT = float(os.getenv("GUARDIAN_TIMEOUT", "15"))  # Seconds per page request
+GUARDIAN_MAX_RETRIES = int(os.getenv("GUARDIAN_MAX_RETRIES", "2"))  # Retries for timeouts, 429s and 5xx errors
+
+# One shared session so every page request (and every edition, in the daemon) reuses the same
+# keep-alive connections
+_session = None
+# Page requests are plain GETs, so a straggling one can safely be sent twice
+guardian_hedger = Hedger("guardian")
+
+
+def get_session(pool_size=MAX_CONCURRENCY):
+    """Returns the shared requests session, importing requests and creating it on first use."""
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+    return _session
+
+
+def fetch_search_page(session, params, page, max_retries=GUARDIAN_MAX_RETRIES):
+    """Fetches a single page of Guardian /search results and returns the 'response' object.
+
+    Timeouts, connection errors, 429s and 5xx errors are retried with backoff (within the
+    edition deadline). Returns None if the page couldn't be fetched.
+    """
+    from requests import RequestException
+
+    deadline = current_deadline()
+    for attempt in range(max_retries + 1):
+        retryable = True
+        try:
+            with metrics.timer("fetch_page"):
+                response = guardian_hedger.call(lambda: session.get(
+                    GUARDIAN_SEARCH_URL, params={**params, "page": page}, timeout=deadline.timeout(GUARDIAN_TIMEOUT)
+                ))
+            metrics.increment("bytes_downloaded", len(response.content))
+            try:
+                data = response.json()
+            except ValueError: # An HTML error page from a proxy or gateway, say
+                data = {}
+            # Sending request and checking for errors
+            if response.status_code == 200 and "response" in data:
+                return data["response"]
+            error = data.get("message") or f"HTTP {response.status_code}"
+            retryable = response.status_code == 429 or response.status_code >= 500
+        except DeadlineExceeded as e:
+            error, retryable = e, False
+        except RequestException as e:
+            error = e
+
+        if not retryable or attempt == max_retries:
+            break
+        metrics.increment("guardian_retries")
+        try:
+            deadline.sleep(backoff_delay(attempt))
+        except DeadlineExceeded as e:
+            error = e
+            break
+    print(f"Failed to fetch news page {page}:", error)
+    return None
+
+
+def clean_article(article):
+    """Turns one raw Guardian result into the dict used by the rest of the newsletter."""
+    fields = article.get("fields", {})
+    body_html = fields.get("body", "")
+
+    # Cleaning the HTML body into plain text (see html_text.py; HTML_EXTRACTOR picks the parser)
+    with metrics.timer("html_extract"):
+        full_text = html_to_text(body_html)
+    metrics.increment("html_bytes_extracted", len(body_html))
+# Creating dictionary with cleaned articles
+    return {
+        "id": article["id"],
+        "title": article["webTitle"],
+        "url": article["webUrl"],
+        "published": article.get("webPublicationDate", ""),
+        "trail_text": fields.get("trailText", ""),
+        "tags": [tag["webTitle"] for tag in article.get("tags", []) if "webTitle" in tag],
+        "text": full_text
+    }
+
+
+def fetch_raw_articles(params, max_articles, max_workers=MAX_CONCURRENCY, max_pages=MAX_PAGES):
+    """Reads up to max_articles raw results, fetching pages concurrently.
+
+    Returns (results, complete) where complete is False if any page failed to load.
+    """
+    session = get_session(max_workers)
+
+    # The first page tells us how many pages there are in total
+    first_page = fetch_search_page(session, params, 1)
+    if first_page is None:
+        return [], False
+# Extracting articles from API response
+    articles = list(first_page.get("results", []))
+    complete = True
+
+    # Work out which of the remaining pages we actually need
+    pages_needed = -(-max_articles // params["page-size"])  # Ceiling division
+    last_page = min(first_page.get("pages", 1), max_pages, pages_needed)
+    remaining_pages = range(first_page.get("currentPage", 1) + 1, last_page + 1)
+
+    if remaining_pages:
+        with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+            # map() keeps the pages in order, so the newest-first ordering is preserved
+            for page in executor.map(lambda p: fetch_search_page(session, params, p), remaining_pages):
+                if page is None:
+                    complete = False
+                    continue
+                articles.extend(page.get("results", []))
+
+    return articles[:max_articles], complete
+
+
 # Define function to get recent news articles
-def get_recent_guardian_sports_news():
+def get_recent_guardian_sports_news(max_articles=5, page_size=PAGE_SIZE,
+                                    max_workers=MAX_CONCURRENCY, max_pages=MAX_PAGES,
+                                    use_store=True):
+    """Fetches up to max_articles sport articles from the last day, reading result pages concurrently.
+
+    With use_store, articles already fetched by an earlier run are served from the local
+    article store and only results newer than its watermark are requested and parsed.
+    Stored articles older than ARTICLE_STORE_RETENTION_DAYS (or the fetch window, if that is
+    longer) are deleted, so the store doesn't grow without limit.
+    """
     now = datetime.utcnow()
-    yesterday = now - timedelta(days=1) 
+    yesterday = now - timedelta(days=1)
 # Ensured news comes from last day
-# Next: building url for the API request from Guardian
-    url = (
-        "https://content.guardianapis.com/search?"
-        f"section=sport&"
-        f"from-date={yesterday.date()}&"
-        f"to-date={now.date()}&"
-        f"order-by=newest&"
-        f"api-key={API_KEY}&"
-        f"show-fields=trailText,body,short-url"
-    )
-
-    response = requests.get(url)
-    data = response.json()
-# Sending request and checking for errors
-    if response.status_code != 200 or "response" not in data:
-        print("Failed to fetch news:", data.get("message", "Unknown error"))
-# Extracting articles from API response
-    articles = data["response"]["results"]
-    if not articles:
-        print("No recent sports articles found.")
-        return []
-# Extracting specific details from articles
-    cleaned_articles = []
-    for i, article in enumerate(articles[:5], start=1):
-        title = article["webTitle"]
-        url = article["webUrl"]
-        body_html = article.get("fields", {}).get("body", "")
-
-        # Cleaning the HTML body into plain text with BeautifulSoup
-        soup = BeautifulSoup(body_html, "html.parser")
-        full_text = soup.get_text()
-# Creating dictionary with cleaned articles
-        cleaned_articles.append({
-            "title": title,
-            "url": url,
-            "text": full_text
-        })
+    window_start = str(yesterday.date())
+    store = ArticleStore() if use_store else None
+    from_date = window_start
+    if store is not None:
+        watermark = store.get_watermark()
+        # Only ask for what came out since the last run (the watermark is an ISO timestamp)
+        if watermark and watermark > from_date:
+            from_date = watermark
+
+# Next: building the query for the API request from Guardian
+    params = {
+        "section": "sport",
+        "from-date": from_date,
+        "to-date": str(now.date()),
+        "order-by": "newest",
+        "api-key": API_KEY,
+        "show-fields": "trailText,body,short-url",
+        "show-tags": "keyword",
+        "page-size": min(page_size, max_articles),
+    }
+
+    try:
+        raw_articles, complete = fetch_raw_articles(params, max_articles, max_workers, max_pages)
+
+        if store is None:
+            if not raw_articles:
+                print("No recent sports articles found.")
+            return [clean_article(article) for article in raw_articles]
+
+        # from-date is inclusive, so skip anything we parsed on a previous run
+        known = store.known_ids(article["id"] for article in raw_articles)
+        new_articles = [clean_article(article) for article in raw_articles if article["id"] not in known]
+        if new_articles:
+            store.add_articles(new_articles)
+        # Nothing before the window is ever read back, so there's no point keeping it
+        keep_since = min(str((now - timedelta(days=ARTICLE_STORE_RETENTION_DAYS)).date()), window_start)
+        expired = store.delete_older_than(keep_since)
+        if expired:
+            print(f"Deleted {expired} stored articles published before {keep_since}.")
+        print(f"Fetched {len(new_articles)} new articles ({len(known)} already stored).")
+        # Only move the watermark on when no page was missed, otherwise the gap would never be fetched
+        if complete and raw_articles:
+            store.set_watermark(max(article.get("webPublicationDate", "") for article in raw_articles))
 
-    return cleaned_articles
+        articles = store.recent_articles(window_start, limit=max_articles)
+        if not articles:
+            print("No recent sports articles found.")
+        return articles
+    finally:
+        if store is not None:
+            store.close()
 # Basic script to show fetched articles
 if __name__ == "__main__":
     articles = get_recent_guardian_sports_news()
@@ -0,0 +1,85 @@
+import os
+import re
+from html.parser import HTMLParser
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# "fast" = streaming stdlib parser below, "bs4" = the original BeautifulSoup path
+HTML_EXTRACTOR = os.getenv("HTML_EXTRACTOR", "fast")
+
+# HTML elements that end a paragraph in the extracted text
+BLOCK_TAGS = ["p", "h1", "h2", "h3", "h4", "li", "blockquote"]
+# Elements whose content never belongs in the article text (scripts, images, embedded tweets/videos...)
+SKIP_TAGS = {"script", "style", "noscript", "figure", "aside", "iframe", "object", "video", "audio", "svg", "template"}
+# Elements that never have content or an end tag (<embed>, <img>, ...), so they're dropped simply by ignoring them
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+
+BLANK_LINES_RE = re.compile(r"[ \t]*\n[ \t\n]*\n[ \t\n]*")
+
+
+class TextExtractor(HTMLParser):
+    """Collects the visible text of an HTML fragment as it is fed, without building a tree.
+
+    Only a counter of open skipped elements and a list of text pieces are kept in memory.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.pieces = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            # No end tag will follow, so these must never touch skip_depth
+            if tag == "br" and not self.skip_depth:
+                self.pieces.append("\n")
+        elif tag in SKIP_TAGS:
+            self.skip_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        # Self-closing tags (<br/>, <iframe/>) have no content to skip
+        if tag == "br" and not self.skip_depth:
+            self.pieces.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            if self.skip_depth:
+                self.skip_depth -= 1
+        elif tag in BLOCK_TAGS and not self.skip_depth:
+            self.pieces.append("\n\n")
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.pieces.append(data)
+
+    def get_text(self):
+        # Collapse runs of blank lines left by nested blocks into a single paragraph break
+        return BLANK_LINES_RE.sub("\n\n", "".join(self.pieces)).strip()
+
+
+def extract_text_fast(body_html):
+    """Converts article HTML to plain text with the streaming stdlib parser."""
+    parser = TextExtractor()
+    parser.feed(body_html)
+    parser.close()
+    return parser.get_text()
+
+
+def extract_text_bs4(body_html):
+    """Converts article HTML to plain text with BeautifulSoup (builds the full tree)."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(body_html, "html.parser")
+    # Keep a blank line after each block so the summarizer can split long articles on paragraphs
+    for block in soup.find_all(BLOCK_TAGS):
+        block.insert_after("\n\n")
+    return soup.get_text().strip()
+
+
+def html_to_text(body_html, extractor=None):
+    """Converts article HTML to plain text using the configured extractor."""
+    if (extractor or HTML_EXTRACTOR) == "bs4":
+        return extract_text_bs4(body_html)
+    return extract_text_fast(body_html)
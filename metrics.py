@@ -0,0 +1,144 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+METRICS_JSON_PATH = os.getenv("METRICS_JSON_PATH", "run_report.json") # JSON report of the last run ("" to disable)
+PROMETHEUS_TEXTFILE_PATH = os.getenv("PROMETHEUS_TEXTFILE_PATH") # e.g. /var/lib/node_exporter/newsletter.prom
+NEWSLETTER_PROFILE = os.getenv("NEWSLETTER_PROFILE") # Write cProfile stats for one run to this path
+
+
+class RunMetrics:
+    """Thread-safe collection of stage timings and counters for one newsletter run."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Starts a fresh run (the daemon calls send_newsletter many times in one process)."""
+        with self.lock:
+            self.started = time.time()
+            self.timings = {}
+            self.counters = {}
+
+    @contextmanager
+    def timer(self, stage):
+        """Times the enclosed block and records it under 'stage' (even if it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            self.timings.setdefault(stage, []).append(seconds)
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self):
+        """Summarizes the run: count/total/mean/p50/p95/max per stage, plus every counter."""
+        with self.lock:
+            timings = {stage: sorted(values) for stage, values in self.timings.items()}
+            counters = dict(self.counters)
+            started = self.started
+
+        stages = {}
+        for stage, values in timings.items():
+            stages[stage] = {
+                "count": len(values),
+                "total_seconds": sum(values),
+                "mean_seconds": sum(values) / len(values),
+                "p50_seconds": percentile(values, 50),
+                "p95_seconds": percentile(values, 95),
+                "max_seconds": values[-1],
+            }
+        return {
+            "started": started,
+            "finished": time.time(),
+            "stages": stages,
+            "counters": counters,
+        }
+
+    def write_json(self, path=METRICS_JSON_PATH, report=None):
+        report = report or self.report()
+        write_atomically(path, json.dumps(report, indent=2, sort_keys=True) + "\n")
+
+    def write_prometheus(self, path=PROMETHEUS_TEXTFILE_PATH, report=None):
+        """Writes the run in Prometheus text format, for node_exporter's textfile collector."""
+        report = report or self.report()
+        lines = [
+            "# HELP newsletter_stage_seconds Time spent in each stage of the last newsletter run.",
+            "# TYPE newsletter_stage_seconds summary",
+        ]
+        for stage, stats in sorted(report["stages"].items()):
+            lines.append(f'newsletter_stage_seconds{{stage="{stage}",quantile="0.5"}} {stats["p50_seconds"]:.6f}')
+            lines.append(f'newsletter_stage_seconds{{stage="{stage}",quantile="0.95"}} {stats["p95_seconds"]:.6f}')
+            lines.append(f'newsletter_stage_seconds_sum{{stage="{stage}"}} {stats["total_seconds"]:.6f}')
+            lines.append(f'newsletter_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        for name, value in sorted(report["counters"].items()):
+            lines.append(f"# TYPE newsletter_{name} gauge")
+            lines.append(f"newsletter_{name} {value}")
+        lines.append("# TYPE newsletter_last_run_timestamp_seconds gauge")
+        lines.append(f"newsletter_last_run_timestamp_seconds {report['finished']:.0f}")
+        write_atomically(path, "\n".join(lines) + "\n")
+
+    def export(self):
+        """Writes whichever outputs are configured and prints a one-line summary per stage."""
+        report = self.report()
+        for stage, stats in sorted(report["stages"].items(), key=lambda item: -item[1]["total_seconds"]):
+            print(f"  {stage:<20} {stats['count']:>5} x  total {stats['total_seconds']:.3f}s  p95 {stats['p95_seconds']:.3f}s")
+        if METRICS_JSON_PATH:
+            self.write_json(METRICS_JSON_PATH, report)
+        if PROMETHEUS_TEXTFILE_PATH:
+            self.write_prometheus(PROMETHEUS_TEXTFILE_PATH, report)
+        return report
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def write_atomically(path, content):
+    """Writes via a temporary file so readers (e.g. node_exporter) never see half a file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def profiled(path=NEWSLETTER_PROFILE):
+    """Runs the enclosed block under cProfile and dumps the stats to 'path' (no-op without a path).
+
+    Read the result with: python -m pstats <path>. cProfile only sees the thread that
+    entered the block; work on worker threads shows up as time waiting on them.
+    """
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"Profile written to {path}")
+
+
+# Shared by every module in the run
+metrics = RunMetrics()
@@ -0,0 +1,121 @@
+import os
+import re
+from collections import defaultdict
+from functools import lru_cache
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+PREFERENCE_ARTICLES = int(os.getenv("PREFERENCE_ARTICLES", "2")) # Extra stories pooled per distinct preference
+PERSONALIZATION_POOL_MAX = int(os.getenv("PERSONALIZATION_POOL_MAX", "40")) # Most stories summarized per edition
+
+WORD_RE = re.compile(r"\w+")
+
+
+def normalize(term):
+    """Lower-cases a term and squashes punctuation/spacing so 'Man Utd' and 'man-utd' match."""
+    return " ".join(WORD_RE.findall(term.lower()))
+
+
+def parse_preferences(spec):
+    """Turns 'football; arsenal; lewis hamilton' (or a list) into a sorted tuple of normalized terms."""
+    if not spec:
+        return ()
+    items = re.split(r"[;|]", spec) if isinstance(spec, str) else spec
+    return tuple(sorted({normalize(item) for item in items if normalize(item)}))
+
+
+def article_terms(article):
+    """Index terms for one article: its Guardian keyword tags (whole and word by word) plus title/trail words."""
+    terms = set()
+    for tag in article.get("tags", []):
+        tag = normalize(tag)
+        terms.add(tag)
+        terms.update(tag.split())
+    terms.update(WORD_RE.findall(article.get("title", "").lower()))
+    terms.update(WORD_RE.findall(article.get("trail_text", "").lower()))
+    return terms
+
+
+def build_inverted_index(articles):
+    """Maps each term to the positions (in 'articles' order) of the articles it appears in."""
+    index = defaultdict(list)
+    for position, article in enumerate(articles):
+        for term in article_terms(article):
+            index[term].append(position)
+    return dict(index)
+
+
+def match_preference(index, preference):
+    """Positions of the articles matching one preference, in article order.
+
+    A tag or single word is looked up directly; a phrase that isn't a tag matches articles
+    that contain all of its words.
+    """
+    if preference in index:
+        return index[preference]
+    words = preference.split()
+    if len(words) < 2 or any(word not in index for word in words):
+        return []
+    matches = set(index[words[0]]).intersection(*(index[word] for word in words[1:]))
+    return sorted(matches)
+
+
+def build_shared_pool(candidates, general_selection, preference_sets,
+                      per_preference=PREFERENCE_ARTICLES, max_size=PERSONALIZATION_POOL_MAX):
+    """Picks the one set of stories that gets summarized for the whole edition.
+
+    Starts with the general top stories, then adds the best 'per_preference' candidates for
+    every distinct subscriber preference until 'max_size' is reached. 'candidates' should be
+    in preference order (e.g. newest first).
+    """
+    pool = list(general_selection)
+    chosen = {id(article) for article in pool}
+    index = build_inverted_index(candidates)
+    distinct_preferences = sorted({preference for preferences in preference_sets for preference in preferences})
+    for preference in distinct_preferences:
+        added = 0
+        for position in match_preference(index, preference):
+            if len(pool) >= max_size or added >= per_preference:
+                break
+            article = candidates[position]
+            if id(article) in chosen:
+                continue
+            pool.append(article)
+            chosen.add(id(article))
+            added += 1
+    return pool
+
+
+class EditionAssembler:
+    """Assembles each subscriber's edition from the shared, already summarized pool.
+
+    Nothing here calls an API: every lookup goes through a precomputed inverted index, and
+    results are cached per distinct set of preferences, since many subscribers share them.
+    """
+
+    def __init__(self, pool, available, size, general_positions):
+        self.index = build_inverted_index(pool)
+        self.available = set(available) # Pool positions that actually have a summary
+        self.size = size
+        self.general = [position for position in general_positions if position in self.available]
+        # Cache per instance, so one edition's selections never leak into the next
+        self.select = lru_cache(maxsize=None)(self._select)
+
+    def _select(self, preferences):
+        """Pool positions for a subscriber with these preferences (a tuple from parse_preferences)."""
+        # Score = how many of the subscriber's preferences an article matches
+        scores = defaultdict(int)
+        for preference in preferences:
+            for position in match_preference(self.index, preference):
+                if position in self.available:
+                    scores[position] += 1
+        # Best matches first (pool order breaks ties), then top up with the general stories
+        chosen = sorted(scores, key=lambda position: (-scores[position], position))[:self.size]
+        for position in self.general:
+            if len(chosen) >= self.size:
+                break
+            if position not in scores:
+                chosen.append(position)
+        return tuple(chosen)
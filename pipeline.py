@@ -0,0 +1,74 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dotenv import load_dotenv
+
+from metrics import metrics
+from summarizer import (SUMMARY_BATCH_MODE, SUMMARY_MAX_WORKERS, article_batches, summarize_article,
+                        summarize_article_batch)
+
+# Load environment variables
+load_dotenv()
+
+# Most articles that may be waiting on (or sitting in) a stage at once; keeps memory flat
+PIPELINE_BUFFER_SIZE = int(os.getenv("PIPELINE_BUFFER_SIZE", "16"))
+
+
+def stream_map(func, items, max_workers, max_pending=PIPELINE_BUFFER_SIZE, deadline=None):
+    """Runs func over items on a thread pool and yields (index, result) as each call finishes.
+
+    Items are pulled from 'items' lazily, with at most max_pending calls queued or running,
+    so a long (or generated) input never piles up in memory. If 'deadline' (a time.monotonic()
+    timestamp) passes, the generator stops and whatever hasn't finished is abandoned.
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    pending = {}
+    numbered_items = enumerate(items)
+    exhausted = False
+    try:
+        while True:
+            # Top the buffer up from the source
+            while not exhausted and len(pending) < max(max_pending, 1):
+                try:
+                    index, item = next(numbered_items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(func, item)] = index
+            if not pending:
+                return
+
+            timeout = None if deadline is None else deadline - time.monotonic()
+            done, _ = wait(pending, timeout=timeout if timeout is None else max(timeout, 0), return_when=FIRST_COMPLETED)
+            if not done:
+                print(f"Deadline reached with {len(pending)} items still pending; continuing without them.")
+                return
+            for future in done:
+                yield pending.pop(future), future.result()
+    finally:
+        # Don't wait for stragglers (or start anything queued) once the consumer stops
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def summarize_and_render(articles, render_block, max_workers=SUMMARY_MAX_WORKERS,
+                         buffer_size=PIPELINE_BUFFER_SIZE, deadline=None, batch=SUMMARY_BATCH_MODE):
+    """Streams articles through summarize -> render.
+
+    Each article starts summarizing as soon as a worker is free, and its block is rendered
+    the moment its summary arrives. Yields (index, summarized_article, rendered_block) in
+    completion order; 'index' is the article's position in the input.
+    With batch=True, articles are grouped into batched requests (see article_batches) and each
+    group's blocks are rendered as soon as its request returns.
+    """
+    if batch:
+        for _, results in stream_map(summarize_article_batch, article_batches(articles), max_workers, buffer_size, deadline):
+            for index, summarized in results:
+                with metrics.timer("render_block"):
+                    block = render_block(summarized)
+                yield index, summarized, block
+        return
+
+    for index, summarized in stream_map(summarize_article, articles, max_workers, buffer_size, deadline):
+        with metrics.timer("render_block"):
+            block = render_block(summarized)
+        yield index, summarized, block
@@ -0,0 +1,161 @@
+import os
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Comma-separated sports/teams/keywords the newsletter cares about, each with an optional weight,
+# e.g. "football:2,arsenal:3,cricket,formula one"
+INTEREST_TERMS = os.getenv("INTEREST_TERMS", "football,cricket,rugby,tennis,formula one,golf")
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))  # 1.0 = pure relevance, 0.0 = pure diversity
+RECENCY_WEIGHT = float(os.getenv("RECENCY_WEIGHT", "0.1"))  # Small boost for newer articles (input is newest first)
+NUM_FEATURES = 1 << 12  # Hashed vocabulary size
+RANKING_MAX_CHARS = 2000  # Only the start of each article is used for ranking
+MMR_SHORTLIST_FACTOR = 10  # MMR picks from the k * this most relevant articles...
+MMR_SHORTLIST_MIN = 100  # ...but never from fewer than this many
+BM25_K1 = 1.5
+BM25_B = 0.75
+TITLE_WEIGHT = 3  # Title words count this many times
+
+WORD_RE = re.compile(r"\w+")
+
+
+def parse_interest_terms(spec=INTEREST_TERMS):
+    """Turns 'term[:weight],...' into {term: weight}.
+
+    Multi-word terms stay together as phrases ('formula one'), so they only match where all
+    their words appear in that order rather than boosting every article that says 'one'.
+    """
+    weights = {}
+    for item in spec.split(","):
+        term, _, weight = item.strip().partition(":")
+        term = " ".join(WORD_RE.findall(term.lower()))
+        if not term:
+            continue
+        weights[term] = weights.get(term, 0.0) + (float(weight) if weight else 1.0)
+    return weights
+
+
+def article_words(article):
+    """The words used for ranking: the opening of the text plus the title, weighted up."""
+    # The headline and opening paragraphs say what a story is about; no need to read it all
+    words = WORD_RE.findall(article.get("text", "")[:RANKING_MAX_CHARS].lower())
+    return words + WORD_RE.findall(article.get("title", "").lower()) * TITLE_WEIGHT
+
+
+def feature_index(word):
+    """Maps a word to its column in the hashed term matrix."""
+    return zlib.crc32(word.encode("utf-8")) % NUM_FEATURES
+
+
+def ranking_text(article):
+    """The article's ranking words as one space-separated string with a space at each end.
+
+    Only this string is kept per article (not a list of word objects), and any word or
+    phrase can be counted in it by searching for ' term ' (see query_term_counts).
+    """
+    return f" {' '.join(article_words(article))} "
+
+
+def query_term_counts(texts, query_terms):
+    """(articles x query terms) counts of each interest term in ranking_text() strings.
+
+    A phrase only counts where its words appear together, in order.
+    """
+    # A lookahead doesn't consume the trailing space, so back-to-back repeats ('arsenal arsenal')
+    # are all counted; str.count(' term ') would skip every other one
+    patterns = [re.compile(f"(?= {re.escape(term)} )") for term in query_terms]
+    counts = np.zeros((len(texts), len(patterns)), dtype=np.float32)
+    for i, text in enumerate(texts):
+        counts[i] = [len(pattern.findall(text)) for pattern in patterns]
+    return counts
+
+
+def term_matrix(word_lists):
+    """Builds the (articles x NUM_FEATURES) hashed count matrix in one bincount pass."""
+    # Unseen words get the next free id; map() over this keeps the per-word loop in C
+    vocabulary = defaultdict()
+    vocabulary.default_factory = vocabulary.__len__
+    rows = []
+    word_ids = []
+    for i, words in enumerate(word_lists):
+        rows.extend([i] * len(words))
+        word_ids.extend(map(vocabulary.__getitem__, words))
+
+    # Work out each distinct word's column once, then map every occurrence with one lookup
+    columns = np.fromiter((feature_index(word) for word in vocabulary), dtype=np.intp, count=len(vocabulary))
+    flat = np.asarray(rows, dtype=np.intp) * NUM_FEATURES + columns[np.asarray(word_ids, dtype=np.intp)]
+    counts = np.bincount(flat, minlength=len(word_lists) * NUM_FEATURES)
+    return counts.reshape(len(word_lists), NUM_FEATURES).astype(np.float32)
+
+
+def bm25_scores(term_counts, doc_lengths, idf, query_weights):
+    """BM25 score of every article against the weighted interest terms, vectorised over all articles.
+
+    'term_counts' is the matrix from query_term_counts, with one column per query term.
+    """
+    if not query_weights:
+        return np.zeros(term_counts.shape[0], dtype=np.float32)
+    weights = np.array(list(query_weights.values()), dtype=np.float32)
+    doc_lengths = doc_lengths[:, None]
+    average_length = max(float(doc_lengths.mean()), 1.0)
+    norm = term_counts + BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths / average_length)
+    return ((term_counts * (BM25_K1 + 1) / norm) * (idf * weights)).sum(axis=1)
+
+
+def inverse_document_frequency(counts):
+    n = counts.shape[0]
+    document_frequency = np.count_nonzero(counts, axis=0)
+    return np.log1p((n - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+
+
+def mmr_select(relevance, vectors, k, mmr_lambda=MMR_LAMBDA):
+    """Maximal marginal relevance: picks k items trading relevance against similarity to earlier picks.
+
+    'vectors' must be L2-normalised rows so dot products are cosine similarities.
+    """
+    k = min(k, len(relevance))
+    selected = []
+    max_similarity = np.zeros(len(relevance), dtype=np.float32)
+    available = np.ones(len(relevance), dtype=bool)
+    for _ in range(k):
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * max_similarity
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, vectors @ vectors[best])
+    return selected
+
+
+def select_top_articles(articles, k, interest_terms=INTEREST_TERMS, mmr_lambda=MMR_LAMBDA):
+    """Ranks articles by interest-term relevance and returns a diverse top k, best first."""
+    if len(articles) <= 1:
+        return list(articles[:k])
+
+    query_weights = parse_interest_terms(interest_terms)
+    texts = [ranking_text(article) for article in articles]
+    term_counts = query_term_counts(texts, query_weights)
+    doc_lengths = np.fromiter((text.count(" ") - 1 for text in texts), dtype=np.float32, count=len(texts))
+    n = len(articles)
+
+    relevance = bm25_scores(term_counts, doc_lengths, inverse_document_frequency(term_counts), query_weights)
+    if relevance.max() > 0:
+        relevance = relevance / relevance.max()
+    # Articles arrive newest first; use that as a gentle tie-breaker
+    relevance = relevance + RECENCY_WEIGHT * (1 - np.arange(n, dtype=np.float32) / n)
+
+    # MMR only ever picks from the most relevant articles, so only those need full term vectors
+    shortlist = np.argsort(-relevance, kind="stable")[:max(k * MMR_SHORTLIST_FACTOR, MMR_SHORTLIST_MIN)]
+    counts = term_matrix([texts[i].split() for i in shortlist])
+    # TF-IDF vectors (log-scaled term frequency) for the cosine similarities used by MMR
+    vectors = np.log1p(counts) * inverse_document_frequency(counts)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms == 0, 1, norms)
+
+    return [articles[shortlist[i]] for i in mmr_select(relevance[shortlist], vectors, k, mmr_lambda)]
@@ -0,0 +1,97 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket that refills continuously at 'rate_per_minute'."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0  # Tokens added per second
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, amount):
+        """Takes 'amount' tokens if available; otherwise returns how many seconds to wait."""
+        # A single request bigger than the whole bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        with self.lock:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.rate
+
+    def refund(self, amount):
+        """Gives back tokens that were taken but not used."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """Keeps API calls within a requests-per-minute and a tokens-per-minute budget.
+
+    Also supports a shared pause, so one 429 response slows every worker down, not just the
+    thread that got it.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self, token_count, timeout=None):
+        """Blocks until one request using roughly 'token_count' tokens may be sent.
+
+        With a timeout, raises TimeoutError instead of waiting longer than that.
+        """
+        give_up_at = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                pause = self.paused_until - time.monotonic()
+            if pause > 0:
+                self._wait(pause, give_up_at)
+                continue
+
+            wait = self.requests.try_acquire(1)
+            if wait > 0:
+                self._wait(wait, give_up_at)
+                continue
+
+            wait = self.tokens.try_acquire(token_count)
+            if wait > 0:
+                # Don't hold on to the request slot while waiting for token budget
+                self.requests.refund(1)
+                self._wait(wait, give_up_at)
+                continue
+            return
+
+    def try_acquire(self, token_count):
+        """Takes budget for one request if there is some right now (and no pause); never blocks."""
+        with self.lock:
+            if self.paused_until > time.monotonic():
+                return False
+        if self.requests.try_acquire(1) > 0:
+            return False
+        if self.tokens.try_acquire(token_count) > 0:
+            self.requests.refund(1)
+            return False
+        return True
+
+    def _wait(self, seconds, give_up_at):
+        if give_up_at is not None and time.monotonic() + seconds > give_up_at:
+            raise TimeoutError("Rate limit wait would exceed the timeout")
+        time.sleep(seconds)
+
+    def pause(self, seconds):
+        """Stops all callers from sending anything for the next 'seconds' seconds."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
@@ -0,0 +1,269 @@
+import datetime
+import re
+from email.charset import QP, Charset
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from functools import lru_cache
+from html import escape
+
+# --- Newsletter template ---
+# Written readably here; compile_template() minifies it once at import time.
+
+NEWSLETTER_CSS = """
+    /* Reset basic styles */
+    body, h1, h2, h3, p, a { margin: 0; padding: 0; font-family: 'Poppins', sans-serif, Helvetica, Arial; box-sizing: border-box; }
+
+    body {
+        width: 100% !important;
+        height: 100%;
+        -webkit-text-size-adjust: 100%;
+        -ms-text-size-adjust: 100%;
+        background-color: #fdf6f9; /* Very light pastel pink background */
+        line-height: 1.6;
+        color: #555; /* Soft dark grey for text */
+    }
+
+    .email-container {
+        max-width: 600px;
+        margin: 20px auto;
+        padding: 30px;
+        background-color: #ffffff; /* White container */
+        border-radius: 15px; /* Rounded corners */
+        box-shadow: 0 4px 15px rgba(0, 0, 0, 0.05); /* Subtle shadow */
+        border: 1px solid #f0e4e8; /* Soft border */
+    }
+
+    .header {
+        text-align: center;
+        margin-bottom: 30px;
+        padding-bottom: 20px;
+        border-bottom: 1px dashed #e8d8de; /* Dashed pastel separator */
+    }
+
+    .header h1 {
+        font-size: 28px;
+        font-weight: 600;
+        color: #e58cba; /* Muted rose pink */
+        margin-bottom: 5px;
+    }
+
+     .header .subtitle {
+        font-size: 14px;
+        color: #aaa;
+        font-weight: 300;
+     }
+
+    .article {
+        margin-bottom: 30px;
+        padding-bottom: 30px;
+        border-bottom: 1px dashed #e8d8de; /* Dashed pastel separator */
+    }
+
+    .article:last-child {
+        margin-bottom: 0;
+        padding-bottom: 0;
+        border-bottom: none; /* No border for the last article */
+    }
+
+    .article h2 {
+        font-size: 20px; /* Slightly smaller than main header */
+        font-weight: 600;
+        color: #6a8dcf; /* Soft blue/lavender */
+        margin-bottom: 10px;
+        line-height: 1.3;
+        /* Title is NOT a link */
+    }
+
+    .summary {
+        font-size: 15px;
+        color: #666; /* Slightly darker grey for summary */
+        margin-bottom: 20px;
+        font-weight: 300; /* Lighter weight for summary */
+    }
+
+    .button {
+        display: inline-block; /* Button behavior */
+        background-color: #87ceeb; /* Pastel sky blue */
+        color: #ffffff !important; /* White text - important to override default link color */
+        padding: 10px 20px;
+        text-decoration: none; /* No underline */
+        border-radius: 25px; /* Pill shape */
+        font-weight: 400;
+        font-size: 14px;
+        text-align: center;
+        transition: background-color 0.3s ease;
+    }
+
+    .button:hover {
+        background-color: #76b8d8; /* Slightly darker blue on hover */
+        color: #ffffff !important; /* Ensure text remains white on hover */
+        text-decoration: none; /* Ensure no underline on hover */
+    }
+
+    .related {
+        margin-top: 15px;
+        padding-left: 18px;
+        font-size: 13px;
+        color: #aaa;
+    }
+
+    .related a {
+        color: #6a8dcf; /* Same soft blue as the titles */
+        text-decoration: none;
+    }
+
+    .footer {
+        text-align: center;
+        margin-top: 30px;
+        font-size: 12px;
+        color: #aaa;
+    }
+
+    /* Responsive styles (basic) */
+    @media only screen and (max-width: 640px) {
+        .email-container {
+            padding: 20px;
+            margin: 10px;
+            border-radius: 10px;
+        }
+         .header h1 {
+            font-size: 24px;
+         }
+         .article h2 {
+            font-size: 18px;
+         }
+         .summary {
+            font-size: 14px;
+         }
+         .button {
+            padding: 12px 25px; /* Slightly larger tap target */
+         }
+    }
+"""
+
+HEADER_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <link rel="preconnect" href="https://fonts.googleapis.com">
+    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+    <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;600&display=swap" rel="stylesheet">
+    <style>{css}</style>
+</head>
+<body>
+    <div class="email-container">
+        <div class="header">
+            <h1>Your Sports Update</h1>
+            <p class="subtitle">Freshly Curated Just For You</p>
+        </div>
+"""
+
+ARTICLE_TEMPLATE = """
+<div class="article">
+    <h2>{title}</h2>
+    <p class="summary">{summary}</p>
+    <a href="{url}" target="_blank" class="button">View Full Article</a>{related}
+</div>
+"""
+
+RELATED_TEMPLATE = """<ul class="related">{links}</ul>"""
+RELATED_LINK_TEMPLATE = """<li><a href="{url}" target="_blank">{title}</a></li>"""
+
+FOOTER_TEMPLATE = """
+        <div class="footer">
+            <p>Happy reading!</p>
+            <p>&copy; {year} Your AI News Bot</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+EMPTY_EDITION_HTML = "<p style='text-align: center; color: #888;'>No fresh news to share right now, check back later! ✨</p>"
+
+# Quoted-printable keeps mostly-ASCII HTML far smaller than the default base64
+UTF8_QP = Charset("utf-8")
+UTF8_QP.body_encoding = QP
+
+
+def minify_css(css):
+    """Strips comments and unneeded whitespace from CSS."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def compile_template(template):
+    """Removes the newlines and indentation used to keep an HTML template readable."""
+    return re.sub(r"\n\s*", "", template.strip())
+
+
+# Compiled once: the shared parts of every copy of the newsletter
+ARTICLE_HTML = compile_template(ARTICLE_TEMPLATE)
+HEADER_HTML = compile_template(HEADER_TEMPLATE).replace("{css}", minify_css(NEWSLETTER_CSS))
+
+
+@lru_cache(maxsize=4)
+def footer_html(year):
+    """The footer only changes once a year, so it is rendered once per year."""
+    return compile_template(FOOTER_TEMPLATE).format(year=year)
+
+
+def render_article_block(article):
+    """Builds the HTML for one summarized article."""
+    related_links = "".join([
+        RELATED_LINK_TEMPLATE.format(url=escape(related.get("url", "#")), title=escape(related.get("title", "Related article")))
+        for related in article.get("related", [])
+    ])
+    return ARTICLE_HTML.format(
+        title=escape(article.get("title", "No Title Available")),
+        summary=escape(article.get("summary", "Summary unavailable.")),
+        url=escape(article.get("url", "#")), # Use '#' as a fallback if URL is missing
+        related=RELATED_TEMPLATE.format(links=related_links) if related_links else "",
+    )
+
+
+def render_html(article_blocks, year=None):
+    """Puts the cached header, the article blocks and the footer together."""
+    body = "".join(article_blocks) or EMPTY_EDITION_HTML
+    return "".join([HEADER_HTML, body, footer_html(year or datetime.date.today().year)])
+
+
+def render_text(articles):
+    """Plain-text version of the newsletter for mail clients that don't show HTML."""
+    sections = ["Your Sports Update\nFreshly Curated Just For You"]
+    for article in articles:
+        lines = [
+            article.get("title", "No Title Available"),
+            "",
+            article.get("summary", "Summary unavailable."),
+            "",
+            f"Read more: {article.get('url', '#')}",
+        ]
+        for related in article.get("related", []):
+            lines.append(f"  - {related.get('title', 'Related article')}: {related.get('url', '#')}")
+        sections.append("\n".join(lines))
+    if not articles:
+        sections.append("No fresh news to share right now, check back later!")
+    sections.append(f"Happy reading!\n(c) {datetime.date.today().year} Your AI News Bot")
+    return "\n\n".join(sections) + "\n"
+
+
+def build_mime_parts(html_body, text_body):
+    """Encodes the plain-text and HTML parts once so every recipient's copy can share them."""
+    return MIMEText(text_body, "plain", UTF8_QP), MIMEText(html_body, "html", UTF8_QP)
+
+
+def build_message(parts, subject, sender, recipient):
+    """Wraps already-encoded parts in a message addressed to one recipient."""
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = sender
+    msg["To"] = recipient
+    # Plain text first: clients show the last part they can display
+    for part in parts:
+        msg.attach(part)
+    return msg
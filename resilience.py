@@ -0,0 +1,240 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+from metrics import metrics, percentile
+
+# Load environment variables
+load_dotenv()
+
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "true").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95")) # Send a backup once a call is slower than this share of recent calls
+HEDGE_MAX_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0.1")) # At most this many backup calls per call made
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5")) # Failures in a row that open a circuit
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "60")) # How long an open circuit waits before a trial call
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised instead of starting (or waiting for) work that couldn't finish before the deadline."""
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a service whose circuit breaker is open."""
+
+
+class Deadline:
+    """A point on the monotonic clock that some work has to be done by (None = no limit)."""
+
+    def __init__(self, seconds=None):
+        self.expires = time.monotonic() + seconds if seconds else None
+
+    def remaining(self):
+        """Seconds left (never negative), or None without a limit."""
+        if self.expires is None:
+            return None
+        return max(self.expires - time.monotonic(), 0.0)
+
+    def expired(self):
+        return self.expires is not None and time.monotonic() >= self.expires
+
+    def ensure(self, seconds=0.0):
+        """Raises DeadlineExceeded if 'seconds' more would take us past the deadline."""
+        remaining = self.remaining()
+        if remaining is not None and remaining <= seconds:
+            raise DeadlineExceeded("Edition deadline reached")
+
+    def timeout(self, limit):
+        """The timeout for one call: 'limit', cut short so the call can't outlive the deadline."""
+        self.ensure()
+        remaining = self.remaining()
+        return limit if remaining is None else min(limit, remaining)
+
+    def sleep(self, seconds):
+        """Waits before a retry, or raises DeadlineExceeded straight away if the retry would be too late."""
+        self.ensure(seconds)
+        time.sleep(seconds)
+
+
+# The deadline of the edition being built; calls made anywhere in the run (on any thread) respect it
+_edition_deadline = Deadline()
+
+
+def current_deadline():
+    return _edition_deadline
+
+
+@contextmanager
+def edition_deadline(seconds):
+    """Sets the deadline every Guardian/OpenAI call in the enclosed block has to meet (0 or None = no limit)."""
+    global _edition_deadline
+    previous = _edition_deadline
+    _edition_deadline = Deadline(seconds)
+    try:
+        yield _edition_deadline
+    finally:
+        _edition_deadline = previous
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Exponential backoff with jitter: about base * 2**attempt (at most 'cap'), randomized by up to half.
+
+    The jitter keeps workers that failed together from all retrying at the same moment.
+    """
+    return min(base * 2 ** attempt, cap) * (0.5 + random.random() / 2)
+
+
+class CircuitBreaker:
+    """Stops calling a service that keeps failing, so callers can fall back at once instead of waiting on timeouts.
+
+    After 'failure_threshold' failures in a row the circuit opens and call() raises
+    CircuitOpenError. Once 'reset_seconds' have passed one trial call is let through: if it
+    works the circuit closes again, if not it stays open for another 'reset_seconds'.
+    'is_failure(error)' decides which errors say something about the service's health.
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS,
+                 is_failure=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.is_failure = is_failure or (lambda error: True)
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go ahead now."""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.trial_running or time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            self.trial_running = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                print(f"{self.name} is responding again; circuit closed.")
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or (self.opened_at is None and self.failures >= self.failure_threshold):
+                if self.opened_at is None:
+                    print(f"{self.name} failed {self.failures} times in a row; circuit opened.")
+                    metrics.increment(f"{self.name.lower()}_circuit_opened")
+                self.opened_at = time.monotonic()
+            self.trial_running = False
+
+    def call(self, func):
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+        try:
+            result = func()
+        except DeadlineExceeded:
+            # We ran out of time; that says nothing about the service
+            with self.lock:
+                self.trial_running = False
+            raise
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure()
+            else:
+                # Not the service's fault (e.g. a rejected recipient): it answered, so count it as up
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+
+class Hedger:
+    """Sends a backup copy of a call that is taking longer than usual, and uses whichever answers first.
+
+    A call gets a backup once it has run longer than the 'percentile' latency of recent calls,
+    so only the slowest few percent are duplicated, and 'max_ratio' caps the extra load.
+    Only use it for calls that are safe to repeat (a GET, a chat completion), never for sending mail.
+    """
+
+    def __init__(self, name, percentile=HEDGE_PERCENTILE, max_ratio=HEDGE_MAX_RATIO, enabled=HEDGE_REQUESTS,
+                 min_samples=20, window=200, max_workers=64):
+        self.name = name
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.enabled = enabled
+        self.min_samples = min_samples
+        self.latencies = deque(maxlen=window)
+        self.calls = 0
+        self.hedges = 0
+        self.lock = threading.Lock()
+        # Abandoned stragglers keep a worker busy until their own timeout, hence the roomy pool
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"hedge-{name}")
+
+    def hedge_delay(self):
+        """How long a call may run before it gets a backup, or None while there's too little history."""
+        with self.lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            latencies = sorted(self.latencies)
+        return percentile(latencies, self.percentile)
+
+    def _timed(self, func):
+        start = time.perf_counter()
+        result = func()
+        with self.lock:
+            self.latencies.append(time.perf_counter() - start)
+        return result
+
+    def _take_hedge(self):
+        with self.lock:
+            if self.hedges >= self.max_ratio * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def _return_hedge(self):
+        with self.lock:
+            self.hedges -= 1
+
+    def call(self, func, admit=None):
+        """Returns func()'s result, from a backup call if the first one straggles.
+
+        'admit()' is asked before a backup is sent (e.g. to take it out of a rate limit) and
+        can say no. If both copies fail, the first error is raised.
+        """
+        with self.lock:
+            self.calls += 1
+        delay = self.hedge_delay() if self.enabled else None
+        if delay is None:
+            return self._timed(func)
+
+        futures = [self.executor.submit(self._timed, func)]
+        done, _ = wait(futures, timeout=delay)
+        if not done and self._take_hedge():
+            if admit is None or admit():
+                metrics.increment(f"{self.name}_hedges")
+                futures.append(self.executor.submit(self._timed, func))
+            else:
+                self._return_hedge() # Nothing was sent, so it shouldn't count against the budget
+
+        errors = []
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                    continue
+                if future is not futures[0]:
+                    metrics.increment(f"{self.name}_hedges_won")
+                return future.result()
+        raise errors[0]
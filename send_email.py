@@ -1,60 +1,115 @@
 import os
 import smtplib
-import datetime # Import datetime to get the current year for the footer
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart # Use MIMEMultipart for HTML emails
+import datetime
+from functools import lru_cache
 from dotenv import load_dotenv
 
 # Import the functions from your other scripts
 # Ensure these files (fetch_news.py and summarizer.py) exist and
 # the functions do what's expected.
 from fetch_news import get_recent_guardian_sports_news
-from summarizer import summarize_articles
+from pipeline import summarize_and_render
+from dedup import deduplicate_articles
+from ranking import select_top_articles
+from personalize import EditionAssembler, build_shared_pool, parse_preferences
+from render import build_mime_parts, render_article_block, render_html, render_text
+from render import build_message as build_newsletter_message
+from metrics import metrics, profiled
+from resilience import edition_deadline
+from delivery import (APP_PASSWORD, DELIVERY_WORKERS, SENDER_EMAIL, SMTP_PORT, SMTP_SERVER, SUBSCRIBERS_SOURCE,
+                      deliver, load_subscribers)
 
 # Load email credentials and recipient from .env
 load_dotenv()
 
 # --- Configuration ---
-SENDER_EMAIL = os.getenv("SENDER_EMAIL")
-APP_PASSWORD = os.getenv("APP_PASSWORD")  # Gmail app password or service-specific password
+# SMTP server, credentials and delivery settings live in delivery.py
 RECIPIENT_EMAIL = os.getenv("RECIPIENT_EMAIL") # Or a comma-separated string "email1@example.com,email2@example.com"
-SMTP_SERVER = "smtp.gmail.com" # Example for Gmail
-SMTP_PORT = 465 # Example port for SSL (Gmail)
+FETCH_ARTICLES = int(os.getenv("FETCH_ARTICLES", "200")) # How many recent articles to look at
+NEWSLETTER_ARTICLES = int(os.getenv("NEWSLETTER_ARTICLES", "5")) # How many stories go in the email
+EDITION_DEADLINE_SECONDS = float(os.getenv("EDITION_DEADLINE_SECONDS", "0")) # Send whatever is ready after this long (0 = wait for all)
+EDITION_DEADLINE_GRACE_SECONDS = float(os.getenv("EDITION_DEADLINE_GRACE_SECONDS", "5")) # Time for trail-text fallbacks to land before stragglers are dropped
 # Using the more engaging subject line
 EMAIL_SUBJECT = "🌸 Your Daily Dose of Sports Sunshine ☀️"
 
 # --- Main Execution ---
 
-def send_newsletter():
-    """Fetches REAL news, summarizes it, and sends the stylish email newsletter."""
+def send_newsletter(edition=None, smtp_pool=None, send_log=None, audience=None):
+    """Fetches REAL news, summarizes it, and sends the stylish email newsletter.
+
+    'edition' names this send in the delivery log (defaults to today's date), so running
+    the same edition again only sends to subscribers who didn't get it the first time.
+    A long-running caller (see daemon.py) can pass its own warm 'smtp_pool' and 'send_log',
+    and an 'audience(subscriber)' check that picks who this edition is for (default: everyone).
+    Stage timings and counters for the run are written out at the end (see metrics.py).
+    """
+    metrics.reset()
+    try:
+        # Fetching and summarizing must finish within the deadline; delivery itself isn't cut short
+        with metrics.timer("total"), edition_deadline(EDITION_DEADLINE_SECONDS) as deadline:
+            _run_newsletter(edition, smtp_pool, send_log, deadline, audience)
+    finally:
+        print("Run metrics:")
+        metrics.export()
+
+
+def _run_newsletter(edition, smtp_pool, send_log, deadline, audience):
     print("--- Starting AI-Powered Newsletter Generation ---")
 
+    subscribers = load_subscribers(fallback=RECIPIENT_EMAIL)
+    if audience is not None:
+        subscribers = [subscriber for subscriber in subscribers if audience(subscriber)]
+    if not subscribers:
+        print("No subscribers to send to. Exiting.")
+        return
+    for subscriber in subscribers:
+        subscriber["preference_terms"] = parse_preferences(subscriber.get("preferences"))
+    preference_sets = [subscriber["preference_terms"] for subscriber in subscribers]
+    personalized = any(preference_sets)
+
     # 1. Fetch Articles (Using your actual function)
     print("Fetching recent sports news...")
     try:
         # Assuming get_recent_guardian_sports_news returns a list of dicts
         # where each dict has at least 'webTitle' and 'webUrl' keys.
-        fetched_articles = get_recent_guardian_sports_news()
+        with metrics.timer("stage_fetch"):
+            fetched_articles = get_recent_guardian_sports_news(max_articles=FETCH_ARTICLES)
         if not fetched_articles:
             print("No new articles fetched. Exiting.")
             return
         print(f"Successfully fetched {len(fetched_articles)} articles.")
+        # Several articles often cover the same event; keep one per story and link the rest
+        with metrics.timer("stage_dedup"):
+            candidates = deduplicate_articles(fetched_articles)
+        # Only the most relevant (and varied) stories are worth paying to summarize
+        with metrics.timer("stage_rank"):
+            general_selection = select_top_articles(candidates, NEWSLETTER_ARTICLES)
+        # With personalization, also pool the best stories for each subscriber preference;
+        # this pool is summarized once and shared by every subscriber's edition
+        pool = build_shared_pool(candidates, general_selection, preference_sets) if personalized else general_selection
+        if personalized:
+            print(f"Pooled {len(pool)} stories for {len({p for p in preference_sets if p})} distinct preference sets.")
     except Exception as e:
         print(f"Error fetching articles: {e}")
         # Optionally send an error email or log the error
         return
 
-    # 2. Summarize Articles (Using your actual function)
+    # 2. Summarize and render articles, streaming each one into the email as its summary arrives
     print("Summarizing articles...")
     try:
-        # Pass the fetched articles to the summarizer.
-        # Assuming summarize_articles returns a list of dicts,
-        # where each dict has 'title', 'url', and 'summary' keys.
-        summarized_data = summarize_articles(fetched_articles)
-        if not summarized_data:
+        # Calls still running at the deadline fall back to trail text; anything not back shortly after is dropped
+        cutoff = deadline.expires + EDITION_DEADLINE_GRACE_SECONDS if deadline.expires is not None else None
+        article_blocks = {}
+        summarized_articles = {}
+        with metrics.timer("stage_summarize"):
+            for index, summarized, block in summarize_and_render(pool, render_article_block, deadline=cutoff):
+                print(f"Ready ({len(article_blocks) + 1}/{len(pool)}): {summarized['title']}")
+                article_blocks[index] = block
+                summarized_articles[index] = summarized
+        if not article_blocks:
             print("No summaries generated. Exiting.")
             return
-        print(f"Successfully generated {len(summarized_data)} summaries.")
+        print(f"Successfully generated {len(article_blocks)} summaries.")
     except Exception as e:
         print(f"Error summarizing articles: {e}")
         # Optionally send an error email or log the error
@@ -63,198 +118,27 @@ def send_newsletter():
     # 3. Format and Send Email
     print("Formatting and sending email...")
     try:
-        # Create the email message container
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = EMAIL_SUBJECT
-        msg["From"] = SENDER_EMAIL
-        msg["To"] = RECIPIENT_EMAIL
-
-        # --- Create the Beautiful HTML Version (Copied from previous refinement) ---
-        # Get the current year dynamically
-        current_year = datetime.date.today().year
-
-        html_body = f"""
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <link rel="preconnect" href="https://fonts.googleapis.com">
-            <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-            <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;600&display=swap" rel="stylesheet">
-            <style>
-                /* Reset basic styles */
-                body, h1, h2, h3, p, a {{ margin: 0; padding: 0; font-family: 'Poppins', sans-serif, Helvetica, Arial; box-sizing: border-box; }}
-
-                body {{
-                    width: 100% !important;
-                    height: 100%;
-                    -webkit-text-size-adjust: 100%;
-                    -ms-text-size-adjust: 100%;
-                    background-color: #fdf6f9; /* Very light pastel pink background */
-                    line-height: 1.6;
-                    color: #555; /* Soft dark grey for text */
-                }}
-
-                .email-container {{
-                    max-width: 600px;
-                    margin: 20px auto;
-                    padding: 30px;
-                    background-color: #ffffff; /* White container */
-                    border-radius: 15px; /* Rounded corners */
-                    box-shadow: 0 4px 15px rgba(0, 0, 0, 0.05); /* Subtle shadow */
-                    border: 1px solid #f0e4e8; /* Soft border */
-                }}
-
-                .header {{
-                    text-align: center;
-                    margin-bottom: 30px;
-                    padding-bottom: 20px;
-                    border-bottom: 1px dashed #e8d8de; /* Dashed pastel separator */
-                }}
-
-                .header h1 {{
-                    font-size: 28px;
-                    font-weight: 600;
-                    color: #e58cba; /* Muted rose pink */
-                    margin-bottom: 5px;
-                }}
-
-                 .header .subtitle {{
-                    font-size: 14px;
-                    color: #aaa;
-                    font-weight: 300;
-                 }}
-
-                .article {{
-                    margin-bottom: 30px;
-                    padding-bottom: 30px;
-                    border-bottom: 1px dashed #e8d8de; /* Dashed pastel separator */
-                }}
-
-                .article:last-child {{
-                    margin-bottom: 0;
-                    padding-bottom: 0;
-                    border-bottom: none; /* No border for the last article */
-                }}
-
-                .article h2 {{
-                    font-size: 20px; /* Slightly smaller than main header */
-                    font-weight: 600;
-                    color: #6a8dcf; /* Soft blue/lavender */
-                    margin-bottom: 10px;
-                    line-height: 1.3;
-                    /* Title is NOT a link */
-                }}
-
-                .summary {{
-                    font-size: 15px;
-                    color: #666; /* Slightly darker grey for summary */
-                    margin-bottom: 20px;
-                    font-weight: 300; /* Lighter weight for summary */
-                }}
-
-                .button {{
-                    display: inline-block; /* Button behavior */
-                    background-color: #87ceeb; /* Pastel sky blue */
-                    color: #ffffff !important; /* White text - important to override default link color */
-                    padding: 10px 20px;
-                    text-decoration: none; /* No underline */
-                    border-radius: 25px; /* Pill shape */
-                    font-weight: 400;
-                    font-size: 14px;
-                    text-align: center;
-                    transition: background-color 0.3s ease;
-                }}
-
-                .button:hover {{
-                    background-color: #76b8d8; /* Slightly darker blue on hover */
-                    color: #ffffff !important; /* Ensure text remains white on hover */
-                    text-decoration: none; /* Ensure no underline on hover */
-                }}
-
-                .footer {{
-                    text-align: center;
-                    margin-top: 30px;
-                    font-size: 12px;
-                    color: #aaa;
-                }}
-
-                /* Responsive styles (basic) */
-                @media only screen and (max-width: 640px) {{
-                    .email-container {{
-                        padding: 20px;
-                        margin: 10px;
-                        border-radius: 10px;
-                    }}
-                     .header h1 {{
-                        font-size: 24px;
-                     }}
-                     .article h2 {{
-                        font-size: 18px;
-                     }}
-                     .summary {{
-                        font-size: 14px;
-                     }}
-                     .button {{
-                        padding: 12px 25px; /* Slightly larger tap target */
-                     }}
-                }}
-
-            </style>
-        </head>
-        <body>
-            <div class="email-container">
-                <div class="header">
-                    <h1>Your Sports Update</h1>
-                    <p class="subtitle">Freshly Curated Just For You</p>
-                </div>
-
-        """
-
-        # Add content if summaries exist
-        if not summarized_data:
-            html_body += "<p style='text-align: center; color: #888;'>No fresh news to share right now, check back later! ✨</p>"
-        else:
-            # Loop through the data returned by YOUR summarizer function
-            for article in summarized_data:
-                # Ensure these .get() calls match the keys in the dicts
-                # returned by your 'summarize_articles' function.
-                # Basic HTML escaping for safety
-                title = article.get('title', 'No Title Available').replace('<', '&lt;').replace('>', '&gt;')
-                summary = article.get('summary', 'Summary unavailable.').replace('<', '&lt;').replace('>', '&gt;')
-                url = article.get('url', '#') # Use '#' as a fallback if URL is missing
-
-                html_body += f"""
-                <div class="article">
-                    <h2>{title}</h2>
-                    <p class="summary">{summary}</p>
-                    <a href="{url}" target="_blank" class="button">View Full Article</a>
-                </div>
-                """
-
-        # Close the container and add a footer
-        html_body += f"""
-                <div class="footer">
-                    <p>Happy reading!</p>
-                    <p>&copy; {current_year} Your AI News Bot</p>
-                </div>
-            </div> </body>
-        </html>
-        """
-
-        # Attach the HTML part to the message
-        part2 = MIMEText(html_body, "html", "utf-8") # Specify UTF-8 encoding
-        msg.attach(part2)
-
-        # Send the email using improved error handling
-        print("Attempting to connect to SMTP server...")
-        with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT) as server:
-            print("Logging in...")
-            server.login(SENDER_EMAIL, APP_PASSWORD)
-            print(f"Sending email to: {RECIPIENT_EMAIL}")
-            # Handles multiple recipients if comma-separated in .env
-            server.send_message(msg, from_addr=SENDER_EMAIL, to_addrs=RECIPIENT_EMAIL.split(','))
+        # Each subscriber's selection is a lookup in the shared pool (the general stories come first in it)
+        assembler = EditionAssembler(pool, article_blocks, NEWSLETTER_ARTICLES, range(len(general_selection)))
+
+        @lru_cache(maxsize=None)
+        def parts_for(selection):
+            # Encoded once per distinct selection; every subscriber with that selection shares the parts
+            with metrics.timer("render_edition"):
+                html_body = render_html([article_blocks[index] for index in selection])
+                text_body = render_text([summarized_articles[index] for index in selection])
+                return build_mime_parts(html_body, text_body)
+
+        def build_message(subscriber):
+            # Each subscriber gets their own copy, addressed only to them
+            parts = parts_for(assembler.select(subscriber["preference_terms"]))
+            return build_newsletter_message(parts, EMAIL_SUBJECT, SENDER_EMAIL, subscriber["email"])
+
+        edition = edition or datetime.date.today().isoformat()
+        print(f"Sending edition {edition} to {len(subscribers)} subscribers over {DELIVERY_WORKERS} SMTP connections...")
+        with metrics.timer("stage_deliver"):
+            counts = deliver(edition, subscribers, build_message, pool=smtp_pool, send_log=send_log)
+        print(f"Delivery finished: {counts['sent']} sent, {counts['skipped']} already sent, {counts['failed']} failed.")
 
         print("✅ Stylish newsletter with REAL articles sent successfully!")
 
@@ -271,7 +155,9 @@ def send_newsletter():
 # Run the newsletter generation process
 if __name__ == "__main__":
     # Add checks for required environment variables before proceeding
-    if not SENDER_EMAIL or not APP_PASSWORD or not RECIPIENT_EMAIL:
-        print("Error: Please ensure SENDER_EMAIL, APP_PASSWORD, and RECIPIENT_EMAIL are set in your .env file.")
+    if not SENDER_EMAIL or not APP_PASSWORD or not (RECIPIENT_EMAIL or SUBSCRIBERS_SOURCE):
+        print("Error: Please ensure SENDER_EMAIL, APP_PASSWORD, and RECIPIENT_EMAIL (or SUBSCRIBERS_SOURCE) are set in your .env file.")
     else:
-        send_newsletter()
\ No newline at end of file
+        # Set NEWSLETTER_PROFILE=run.prof to also get a cProfile dump of this run
+        with profiled():
+            send_newsletter()
\ No newline at end of file
@@ -1,74 +1,490 @@
 import os
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from dotenv import load_dotenv
-from openai import OpenAI
 
 # Import the function from your fetch_news script
 from fetch_news import get_recent_guardian_sports_news
+from html_text import html_to_text
+from rate_limiter import RateLimiter
+from metrics import metrics
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, Hedger, backoff_delay, current_deadline
+from summary_cache import SummaryCache, make_cache_key
+from tokens import count_tokens, split_into_chunks, truncate_to_tokens
 
 # Load .env variables
 load_dotenv()
 
-# Initialize OpenAI Client (assumes OPENAI_API_KEY is in the environment)
-client = OpenAI()
+# The OpenAI client is created on first use (see get_client) and then kept for the life of
+# the process, so a long-running daemon reuses its connection pool between editions.
+_client = None
+_client_lock = threading.Lock()
 
 SUMMARY_PROMPT_TEMPLATE = (
     "Summarize the following sports news article in 2–3 clear, objective, and professional-sounding sentences, "
     "suitable for inclusion in an email newsletter.\n\nArticle:\n{article_text}"
 )
+SYSTEM_PROMPT = "You are a helpful assistant that summarizes sports articles concisely and professionally for a newsletter."
+MODEL = "gpt-3.5-turbo" # Or consider newer/cheaper models if appropriate
+TEMPERATURE = 0.5 # Lower temperature for more factual summaries
+MAX_TOKENS = 150  # Adjust based on desired summary length (2-3 sentences ~ 60-100 tokens usually)
 
-def summarize_article_text(article_text):
-    """Summarizes a single piece of text using the OpenAI API."""
-    # Limit text length to avoid excessive token usage/cost
-    # Adjust the limit (e.g., 4000 chars ~ 1000 tokens) based on model and needs
-    max_chars = 4000
-    truncated_text = article_text[:max_chars]
+# Batch mode packs several articles into one request and asks for JSON back
+BATCH_PROMPT_TEMPLATE = (
+    "Summarize each of the following {count} sports news articles in 2–3 clear, objective, and professional-sounding "
+    "sentences, suitable for inclusion in an email newsletter. Each article starts with its index in square brackets.\n"
+    'Reply with JSON only, in the form {{"summaries": [{{"index": 0, "summary": "..."}}]}}, '
+    "with exactly one entry per article.\n\nArticles:\n{articles}"
+)
+# Long articles are split into chunks that are summarized separately and then merged (map-reduce)
+CHUNK_PROMPT_TEMPLATE = (
+    "The following is part {part} of {parts} of a longer sports news article. Summarize the key facts in it "
+    "(who, what, scores and results) in 2–3 clear, objective sentences.\n\nExcerpt:\n{article_text}"
+)
+MERGE_PROMPT_TEMPLATE = (
+    "The following are summaries of consecutive parts of one sports news article. Combine them into a single "
+    "2–3 sentence summary that is clear, objective, and professional-sounding, suitable for inclusion in an email "
+    "newsletter. Make sure the final result or outcome is included if one is given.\n\nPart summaries:\n{summaries}"
+)
+SUMMARY_MAX_INPUT_TOKENS = int(os.getenv("SUMMARY_MAX_INPUT_TOKENS", "1000"))  # Article tokens sent per request
+SUMMARY_MAX_CHUNKS = int(os.getenv("SUMMARY_MAX_CHUNKS", "12"))  # Caps the cost of very long articles
+
+SUMMARY_BATCH_MODE = os.getenv("SUMMARY_BATCH_MODE", "false").lower() in ("1", "true", "yes")
+SUMMARY_BATCH_TOKEN_BUDGET = int(os.getenv("SUMMARY_BATCH_TOKEN_BUDGET", "6000"))  # Prompt + output tokens per request
+SUMMARY_BATCH_MAX_ARTICLES = int(os.getenv("SUMMARY_BATCH_MAX_ARTICLES", "10"))
+
+# Concurrency and rate limit settings (set these to match your OpenAI account tier)
+SUMMARY_MAX_WORKERS = int(os.getenv("SUMMARY_MAX_WORKERS", "8"))
+OPENAI_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500"))
+OPENAI_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "200000"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))  # Seconds per request (the client's own default is 10 minutes)
+
+rate_limiter = RateLimiter(OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE)
+summary_cache = SummaryCache()
+# Duplicates requests that straggle past the usual latency
+openai_hedger = Hedger("openai")
+# SUMMARY_MAX_WORKERS caps the requests in flight across the whole process, however the calls
+# are nested (articles -> chunks, batches -> single-article fallbacks)
+openai_slots = threading.BoundedSemaphore(max(1, SUMMARY_MAX_WORKERS))
+# Shared pool for fanning out the requests of one article or batch (see map_requests)
+request_executor = ThreadPoolExecutor(max_workers=max(1, SUMMARY_MAX_WORKERS), thread_name_prefix="openai-request")
+
+
+def is_openai_outage(error):
+    """True for errors that say the API is down or failing (429s are handled by the rate limiter instead)."""
+    from openai import APIConnectionError, InternalServerError
+
+    return isinstance(error, (APIConnectionError, InternalServerError))
+
+
+# Once OpenAI keeps failing, articles get their trail text straight away instead of waiting on timeouts
+llm_breaker = CircuitBreaker("OpenAI", is_failure=is_openai_outage)
+
+# Returned when the API call fails and there's no trail text to fall back on; never cached
+API_ERROR_SUMMARY = "Summary unavailable due to an API error."
+
+
+def get_client():
+    """Returns the shared OpenAI client, importing openai and creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                # Initialize OpenAI Client (assumes OPENAI_API_KEY is in the environment)
+                # The client's own retries are turned off; 429s and transient errors are retried in
+                # create_completion so that every worker backs off together through the shared rate limiter.
+                _client = OpenAI(max_retries=0)
+    return _client
+
+
+def retry_delay(error, attempt):
+    """Seconds to wait before retrying: the server's Retry-After if given, else exponential backoff."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        if retry_after is not None:
+            return float(retry_after)
+    except ValueError:
+        pass
+    return backoff_delay(attempt)
+
+
+def create_completion(messages, max_tokens, **kwargs):
+    """Sends one chat completion request within the rate limits, retrying 429s and transient errors.
+
+    Every attempt is bounded by OPENAI_TIMEOUT and the edition deadline, and goes through the
+    OpenAI circuit breaker, so once the API keeps failing this raises CircuitOpenError straight
+    away. Otherwise raises the last error if every attempt fails.
+    """
+    from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+    client = get_client()
+    deadline = current_deadline()
+    token_estimate = sum(count_tokens(m["content"]) for m in messages) + max_tokens
+
+    def send():
+        timeout = deadline.timeout(OPENAI_TIMEOUT)
+        try:
+            return client.chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                temperature=TEMPERATURE,
+                max_tokens=max_tokens,
+                timeout=timeout,
+                **kwargs
+            )
+        except APITimeoutError as e:
+            if timeout < OPENAI_TIMEOUT:
+                # The edition deadline cut this request short, so it says nothing about OpenAI's health
+                raise DeadlineExceeded("Edition deadline reached during an OpenAI request") from e
+            raise
+
+    def send_within_limits():
+        # The slot is held while the request is waiting on the rate limit or in flight, not during backoff
+        if not openai_slots.acquire(timeout=deadline.remaining()):
+            raise DeadlineExceeded("Edition deadline reached while waiting for a free request slot")
+        try:
+            try:
+                rate_limiter.acquire(token_estimate, timeout=deadline.remaining())
+            except TimeoutError:
+                raise DeadlineExceeded("Edition deadline reached while waiting for the rate limit")
+            with metrics.timer("openai_call"):
+                # A backup request also has to fit in the rate limits
+                return llm_breaker.call(
+                    lambda: openai_hedger.call(send, admit=lambda: rate_limiter.try_acquire(token_estimate))
+                )
+        finally:
+            openai_slots.release()
+
+    for attempt in range(OPENAI_MAX_RETRIES + 1):
+        try:
+            response = send_within_limits()
+            # Token usage is what we pay for, so keep track of it
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                metrics.increment("openai_prompt_tokens", usage.prompt_tokens or 0)
+                metrics.increment("openai_completion_tokens", usage.completion_tokens or 0)
+            return response
+        except RateLimitError as e:
+            metrics.increment("openai_rate_limited")
+            if attempt == OPENAI_MAX_RETRIES:
+                raise
+            metrics.increment("openai_retries")
+            delay = retry_delay(e, attempt)
+            deadline.ensure(delay)
+            print(f"Rate limited by OpenAI, backing off for {delay:.1f}s...")
+            # Everyone waits, not just this worker, so we stop hammering the API
+            rate_limiter.pause(delay)
+        except (APIConnectionError, InternalServerError) as e: # Includes timeouts
+            if attempt == OPENAI_MAX_RETRIES:
+                raise
+            metrics.increment("openai_retries")
+            deadline.sleep(retry_delay(e, attempt))
+
+
+def truncate_article_text(article_text):
+    """Limits text length to avoid excessive token usage/cost on extremely long articles."""
+    # Anything over SUMMARY_MAX_INPUT_TOKENS is chunked, so this only trims what wouldn't fit in SUMMARY_MAX_CHUNKS
+    return truncate_to_tokens(article_text, SUMMARY_MAX_INPUT_TOKENS * SUMMARY_MAX_CHUNKS)
+
+
+def is_long_text(truncated_text):
+    """True if the text needs the chunked map-reduce path rather than a single request."""
+    return count_tokens(truncated_text) > SUMMARY_MAX_INPUT_TOKENS
+
+
+def summary_cache_key(truncated_text, batched=False):
+    """Same text + prompt + model settings always gives an equivalent summary, so it can be reused.
+
+    'batched' is for a short text summarized as part of a batch request, whose summary comes
+    from BATCH_PROMPT_TEMPLATE (long texts always take the chunked path).
+    """
+    if is_long_text(truncated_text):
+        return make_cache_key(truncated_text, CHUNK_PROMPT_TEMPLATE, MERGE_PROMPT_TEMPLATE, SYSTEM_PROMPT,
+                              MODEL, TEMPERATURE, MAX_TOKENS, SUMMARY_MAX_INPUT_TOKENS)
+    prompt_template = BATCH_PROMPT_TEMPLATE if batched else SUMMARY_PROMPT_TEMPLATE
+    return make_cache_key(truncated_text, prompt_template, SYSTEM_PROMPT, MODEL, TEMPERATURE, MAX_TOKENS)
+
+
+def clean_summary(summary):
+    """Basic check for empty or placeholder summaries."""
+    summary = (summary or "").strip()
+    if not summary or "summary is unavailable" in summary.lower():
+        return "Could not generate a meaningful summary for this article."
+    return summary
+
+
+def map_requests(func, items):
+    """Returns [func(item) for item in items], run concurrently on the shared request pool.
+
+    Calls made from a worker of that pool run inline instead, so nested fan-outs can't
+    deadlock waiting on a pool they are themselves occupying.
+    """
+    items = list(items)
+    if len(items) <= 1 or threading.current_thread().name.startswith("openai-request"):
+        return [func(item) for item in items]
+    # map() returns results in input order, whichever call finishes first
+    return list(request_executor.map(func, items))
+
+
+def request_summary(prompt):
+    """Sends one summarization prompt and returns the model's reply text."""
+    response = create_completion(
+        [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=MAX_TOKENS
+    )
+    return response.choices[0].message.content or ""
+
+
+def summarize_long_text(text):
+    """Map-reduce summary: summarizes each chunk concurrently, then merges the chunk summaries."""
+    chunks = split_into_chunks(text, SUMMARY_MAX_INPUT_TOKENS)
+    if len(chunks) == 1:
+        return request_summary(SUMMARY_PROMPT_TEMPLATE.format(article_text=chunks[0]))
+
+    prompts = [
+        CHUNK_PROMPT_TEMPLATE.format(part=i, parts=len(chunks), article_text=chunk)
+        for i, chunk in enumerate(chunks, start=1)
+    ]
+    chunk_summaries = map_requests(request_summary, prompts)
+
+    merged = "\n\n".join(summary.strip() for summary in chunk_summaries)
+    # Many chunks can give a merge input that is itself too long, so reduce again until it fits
+    if count_tokens(merged) > SUMMARY_MAX_INPUT_TOKENS:
+        merged = summarize_long_text(merged)
+    return request_summary(MERGE_PROMPT_TEMPLATE.format(summaries=merged))
+
+
+def fallback_summary(trail_text):
+    """What an article gets when OpenAI can't summarize it in time: the Guardian's own trail text."""
+    metrics.increment("summary_fallbacks")
+    trail = html_to_text(trail_text or "").strip()
+    return trail or API_ERROR_SUMMARY
 
+
+def summarize_article_text(article_text, trail_text=""):
+    """Summarizes a single piece of text using the OpenAI API.
+
+    A cached summary is used when there is one. If OpenAI is failing (or the edition deadline
+    has passed) the article's 'trail_text' is used instead, and nothing is cached.
+    """
+    truncated_text = truncate_article_text(article_text)
+    cache_key = summary_cache_key(truncated_text)
+    cached = summary_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return summarize_uncached_text(truncated_text, cache_key, trail_text)
+
+
+def summarize_uncached_text(truncated_text, cache_key, trail_text=""):
+    """Requests a summary of (already truncated) text that missed the cache, and caches it under 'cache_key'."""
+    try:
+        if is_long_text(truncated_text):
+            summary = summarize_long_text(truncated_text)
+        else:
+            summary = request_summary(SUMMARY_PROMPT_TEMPLATE.format(article_text=truncated_text))
+        summary = clean_summary(summary)
+        summary_cache.put(cache_key, summary)
+        return summary
+
+    except (CircuitOpenError, DeadlineExceeded):
+        return fallback_summary(trail_text)
+    except Exception as e:
+        print(f"Error during OpenAI API call: {e}")
+        metrics.increment("summary_api_errors")
+        return fallback_summary(trail_text)
+
+
+@lru_cache(maxsize=None)
+def batch_response_model():
+    """The pydantic model for batch replies (built on first use, so pydantic is only imported when needed)."""
+    from pydantic import BaseModel
+
+    class ArticleSummary(BaseModel):
+        index: int
+        summary: str
+
+    class BatchSummaries(BaseModel):
+        summaries: list[ArticleSummary]
+
+    return BatchSummaries
+
+
+def pack_batches(texts, token_budget=SUMMARY_BATCH_TOKEN_BUDGET, max_batch_size=SUMMARY_BATCH_MAX_ARTICLES):
+    """Groups text indexes into batches whose prompts stay under token_budget.
+
+    A text that is bigger than the budget on its own still gets a batch of one.
+    """
+    batches = []
+    current = []
+    current_tokens = count_tokens(SYSTEM_PROMPT) + count_tokens(BATCH_PROMPT_TEMPLATE)
+    base_tokens = current_tokens
+    for i, text in enumerate(texts):
+        # Each article also costs its own output tokens, which count against the same budget
+        cost = count_tokens(text) + MAX_TOKENS
+        if current and (current_tokens + cost > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current = []
+            current_tokens = base_tokens
+        current.append(i)
+        current_tokens += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def summarize_batch(texts):
+    """Summarizes several (already truncated) texts in one request.
+
+    Returns a dict of position -> summary for the entries that came back valid; anything
+    missing or malformed is left out so the caller can fall back to a single-article call.
+    """
+    from pydantic import ValidationError
+
+    articles_block = "\n\n".join(f"[{i}]\n{text}" for i, text in enumerate(texts))
+    prompt = BATCH_PROMPT_TEMPLATE.format(count=len(texts), articles=articles_block)
     try:
-        prompt = SUMMARY_PROMPT_TEMPLATE.format(article_text=truncated_text)
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo", # Or consider newer/cheaper models if appropriate
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that summarizes sports articles concisely and professionally for a newsletter."},
+        response = create_completion(
+            [
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.5, # Lower temperature for more factual summaries
-            max_tokens=150  # Adjust based on desired summary length (2-3 sentences ~ 60-100 tokens usually)
+            max_tokens=MAX_TOKENS * len(texts),
+            response_format={"type": "json_object"}
         )
-        summary = response.choices[0].message.content.strip()
-        # Basic check for empty or placeholder summaries
-        if not summary or "summary is unavailable" in summary.lower():
-             return "Could not generate a meaningful summary for this article."
-        return summary
-
+        parsed = batch_response_model().model_validate_json(response.choices[0].message.content or "")
+    except ValidationError as e:
+        print(f"Batch summary response could not be parsed ({len(e.errors())} errors), falling back to single calls.")
+        return {}
     except Exception as e:
         print(f"Error during OpenAI API call: {e}")
-        return "Summary unavailable due to an API error."
+        return {}
+
+    results = {}
+    for item in parsed.summaries:
+        summary = item.summary.strip()
+        if 0 <= item.index < len(texts) and summary and item.index not in results:
+            results[item.index] = summary
+    return results
+
+
+def summarize_texts_batched(article_texts, token_budget=SUMMARY_BATCH_TOKEN_BUDGET, trail_texts=None):
+    """Returns one summary per text, packing cache misses into as few requests as the budget allows.
+
+    'trail_texts' (one per text) are the fallbacks used when OpenAI can't deliver a summary.
+    """
+    trail_texts = trail_texts or [""] * len(article_texts)
+    truncated = [truncate_article_text(text) for text in article_texts]
+    keys = [summary_cache_key(text, batched=True) for text in truncated]
+    summaries = [summary_cache.get(key) for key in keys]
+    missing = [i for i, summary in enumerate(summaries) if summary is None]
+    # Long articles need the chunked path, so only short ones are packed into batches
+    failed = [i for i in missing if is_long_text(truncated[i])]
+    missing = [i for i in missing if not is_long_text(truncated[i])]
+    if not missing and not failed:
+        return summaries
+
+    batches = [[missing[j] for j in batch] for batch in pack_batches([truncated[i] for i in missing], token_budget)]
+    if batches:
+        print(f"Summarizing {len(missing)} articles in {len(batches)} batched requests...")
+
+    def run_batch(batch):
+        return batch, summarize_batch([truncated[i] for i in batch])
+
+    for batch, results in map_requests(run_batch, batches):
+        for position, i in enumerate(batch):
+            if position in results:
+                summaries[i] = clean_summary(results[position])
+                summary_cache.put(keys[i], summaries[i])
+            else:
+                failed.append(i)
+
+    if failed:
+        print(f"Using single-article calls for {len(failed)} articles.")
+        # These already missed the cache above, so go straight to the request (the single-article
+        # prompt gives a differently keyed summary from the batch one)
+        for i, summary in zip(failed, map_requests(
+                lambda i: summarize_uncached_text(truncated[i], summary_cache_key(truncated[i]), trail_texts[i]), failed)):
+            summaries[i] = summary
+    return summaries
+
 
-def summarize_articles(articles):
-    """Takes a list of article dictionaries (with 'text') and adds a 'summary' field."""
-    summarized = []
+def article_batches(articles, token_budget=SUMMARY_BATCH_TOKEN_BUDGET):
+    """Groups articles into lists of (position, article) that each fit in one batched request."""
+    articles = list(articles)
+    texts = [truncate_article_text(article.get("text", "")) for article in articles]
+    for batch in pack_batches(texts, token_budget):
+        yield [(i, articles[i]) for i in batch]
+
+
+def summarize_article_batch(numbered_articles):
+    """Summarizes one group from article_batches, in a single request where possible.
+
+    Returns a list of (position, summary result) in the same order as the group.
+    """
+    articles = [article for _, article in numbered_articles]
+    print(f"Summarizing a batch of {len(articles)} articles...")
+    with metrics.timer("summarize_batch"):
+        summaries = summarize_texts_batched([article.get("text", "") for article in articles],
+                                            trail_texts=[article.get("trail_text", "") for article in articles])
+    return [(position, build_summary_result(article, summary))
+            for (position, article), summary in zip(numbered_articles, summaries)]
+
+
+def build_summary_result(article, summary):
+    """The dict handed on to the email for one summarized article."""
+    return {
+        "title": article.get("title", "No Title"),
+        "url": article.get("url", "#"), # Use '#' as fallback URL
+        "summary": summary,
+        "related": article.get("related", []) # Other articles on the same story (see dedup.py)
+    }
+
+
+def summarize_article(article):
+    """Summarizes one article dict (with 'title', 'url' and 'text')."""
+    print(f"Summarizing article: {article.get('title', 'No Title Provided')}")
+    with metrics.timer("summarize_article"):
+        summary = summarize_article_text(article.get("text", ""), article.get("trail_text", "")) # Pass empty string if 'text' is missing
+    return build_summary_result(article, summary)
+
+
+def summarize_articles(articles, max_workers=SUMMARY_MAX_WORKERS, batch=SUMMARY_BATCH_MODE):
+    """Takes a list of article dictionaries (with 'text') and adds a 'summary' field.
+
+    Articles are summarized concurrently (up to max_workers at a time, within the rate
+    limits; however many requests they fan out into, no more than SUMMARY_MAX_WORKERS are
+    in flight at once) and the results come back in the same order as the input. With
+    batch=True, several articles are sent per request instead of one each.
+    """
     # Ensure 'articles' is a list before iterating
     if not isinstance(articles, list):
         print("Error: Input 'articles' is not a list.")
         return []
 
+    valid_articles = []
     for i, article in enumerate(articles, start=1):
         # Defensive check for necessary keys
         if not all(k in article for k in ['title', 'url', 'text']):
             print(f"Skipping article {i}: missing 'title', 'url', or 'text'. Article data: {article}")
             continue
+        valid_articles.append(article)
 
-        print(f"Summarizing article {i}/{len(articles)}: {article.get('title', 'No Title Provided')}")
-        summary = summarize_article_text(article.get("text", "")) # Pass empty string if 'text' is missing
-        summarized.append({
-            "title": article.get("title", "No Title"),
-            "url": article.get("url", "#"), # Use '#' as fallback URL
-            "summary": summary
-        })
-        # Consider adjusting sleep time based on API rate limits and number of articles
-        time.sleep(1) # Pause between API calls
-    return summarized
+    if not valid_articles:
+        return []
+    if batch:
+        summaries = summarize_texts_batched([article.get("text", "") for article in valid_articles],
+                                            trail_texts=[article.get("trail_text", "") for article in valid_articles])
+        return [build_summary_result(article, summary) for article, summary in zip(valid_articles, summaries)]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(valid_articles)))) as executor:
+        # map() returns results in input order, whichever call finishes first
+        return list(executor.map(summarize_article, valid_articles))
 
 if __name__ == "__main__":
     print("Fetching recent sports news...")
@@ -91,4 +507,5 @@ if __name__ == "__main__":
                 print(f"URL: {summary_data['url']}")
                 print(f"Summary: {summary_data['summary']}")
         print("\n--------------------------")
+        print(f"Summary cache: {summary_cache.stats()}")
         print("Summarization process complete.")
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+
+from metrics import metrics
+
+# Load environment variables
+load_dotenv()
+
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", "summary_cache.db")
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "5000"))
+SUMMARY_CACHE_MAX_AGE_DAYS = float(os.getenv("SUMMARY_CACHE_MAX_AGE_DAYS", "30"))
+
+
+def make_cache_key(*parts):
+    """Builds a content-addressed key from everything that affects the summary."""
+    payload = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """Persistent SQLite cache of generated summaries with age and size based eviction.
+
+    Safe to share between the summarizer's worker threads.
+    """
+
+    def __init__(self, path=SUMMARY_CACHE_PATH, max_entries=SUMMARY_CACHE_MAX_ENTRIES,
+                 max_age_days=SUMMARY_CACHE_MAX_AGE_DAYS):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 24 * 60 * 60
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.writes_since_eviction = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS summaries (
+                key TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self.evict()
+
+    def get(self, key):
+        """Returns the cached summary for 'key', or None on a miss."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT summary, created FROM summaries WHERE key = ?", (key,)
+            ).fetchone()
+            now = time.time()
+            if row is None or now - row[1] > self.max_age_seconds:
+                self.misses += 1
+                metrics.increment("summary_cache_misses")
+                return None
+            self.hits += 1
+            metrics.increment("summary_cache_hits")
+            with self.conn:
+                self.conn.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def put(self, key, summary):
+        """Stores a summary, evicting old or least recently used entries now and then."""
+        with self.lock:
+            now = time.time()
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO summaries (key, summary, created, last_used) VALUES (?, ?, ?, ?)",
+                    (key, summary, now, now),
+                )
+            self.writes_since_eviction += 1
+            if self.writes_since_eviction < 100:
+                return
+        self.evict()
+
+    def evict(self):
+        """Drops entries older than max_age_days, then the least recently used beyond max_entries."""
+        with self.lock:
+            self.writes_since_eviction = 0
+            with self.conn:
+                self.conn.execute(
+                    "DELETE FROM summaries WHERE created < ?", (time.time() - self.max_age_seconds,)
+                )
+                self.conn.execute(
+                    "DELETE FROM summaries WHERE key NOT IN "
+                    "(SELECT key FROM summaries ORDER BY last_used DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+
+    def stats(self):
+        """Returns the hit/miss counters for this process."""
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses}
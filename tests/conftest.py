@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# The modules live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Modules open their stores at import time; keep the tests away from the real ones
+_scratch = tempfile.mkdtemp(prefix="newsletter-tests-")
+os.environ["SUMMARY_CACHE_PATH"] = os.path.join(_scratch, "summary_cache.db")
+os.environ["ARTICLE_STORE_PATH"] = os.path.join(_scratch, "articles.db")
+os.environ["SEND_LOG_PATH"] = os.path.join(_scratch, "send_log.db")
@@ -0,0 +1,58 @@
+from datetime import datetime, time, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from daemon import edition_audience, next_run, parse_schedule
+
+LONDON = ZoneInfo("Europe/London")
+
+
+def test_parse_schedule_uses_the_default_timezone():
+    assert parse_schedule("07:00, 18:30@Europe/London", "UTC") == [
+        (time(7, 0), ZoneInfo("UTC")), (time(18, 30), LONDON),
+    ]
+    with pytest.raises(ValueError):
+        parse_schedule(" , ")
+
+
+def test_next_run_keeps_wall_clock_time_when_clocks_go_back():
+    # British Summer Time ends at 01:00 UTC on 25 October 2026
+    run_at, edition = next_run(parse_schedule("07:00@Europe/London"), datetime(2026, 10, 24, 8, 0, tzinfo=timezone.utc))
+    assert run_at.astimezone(timezone.utc) == datetime(2026, 10, 25, 7, 0, tzinfo=timezone.utc)
+    assert edition == "2026-10-25-0700-Europe/London"
+
+
+def test_next_run_keeps_wall_clock_time_when_clocks_go_forward():
+    # British Summer Time starts at 01:00 UTC on 29 March 2026
+    run_at, _ = next_run(parse_schedule("07:00@Europe/London"), datetime(2026, 3, 28, 8, 0, tzinfo=timezone.utc))
+    assert run_at.astimezone(timezone.utc) == datetime(2026, 3, 29, 6, 0, tzinfo=timezone.utc)
+
+
+def test_next_run_picks_the_soonest_entry_strictly_after_now():
+    schedule = parse_schedule("07:00@Europe/London, 07:00@America/New_York, 18:30@Europe/London")
+    now = datetime(2026, 6, 1, 6, 0, tzinfo=timezone.utc) # 07:00 in London, 02:00 in New York
+    run_at, edition = next_run(schedule, now)
+    assert edition == "2026-06-01-0700-America/New_York"
+    assert run_at.astimezone(timezone.utc) == datetime(2026, 6, 1, 11, 0, tzinfo=timezone.utc)
+
+
+def test_each_timezone_entry_goes_to_its_own_subscribers_only():
+    schedule = parse_schedule("07:00@Europe/London, 18:30@Europe/London, 07:00@America/New_York")
+    subscribers = [
+        {"email": "london@example.com", "timezone": "Europe/London"},
+        {"email": "ny@example.com", "timezone": "America/New_York"},
+        {"email": "unset@example.com"},
+        {"email": "tokyo@example.com", "timezone": "Asia/Tokyo"},
+    ]
+
+    def audience_of(zone, default_timezone="UTC"):
+        audience = edition_audience(schedule, ZoneInfo(zone), default_timezone)
+        return [subscriber["email"] for subscriber in subscribers if audience(subscriber)]
+
+    # No entries for UTC or Tokyo, so those subscribers fall back to the first entry's timezone
+    assert audience_of("Europe/London") == ["london@example.com", "unset@example.com", "tokyo@example.com"]
+    assert audience_of("America/New_York") == ["ny@example.com"]
+    assert audience_of("America/New_York", default_timezone="America/New_York") == [
+        "ny@example.com", "unset@example.com", "tokyo@example.com",
+    ]
@@ -0,0 +1,37 @@
+import json
+import os
+
+from dedup import deduplicate_articles, find_duplicate_groups, key_terms
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "same_story_articles.json")
+
+
+def load_fixture():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_separately_written_pieces_on_one_game_collapse():
+    # A live blog, match report and reaction piece per game, plus unrelated stories about the same clubs
+    fixture = load_fixture()
+    deduplicated = deduplicate_articles(fixture["articles"])
+
+    assert len(deduplicated) == len(fixture["stories"])
+    for story, article in zip(fixture["stories"], deduplicated):
+        assert article["title"] == fixture["articles"][story[0]]["title"]
+        assert [related["title"] for related in article["related"]] == [
+            fixture["articles"][i]["title"] for i in story[1:]
+        ]
+
+
+def test_find_duplicate_groups_keeps_input_order_and_singletons():
+    texts = ["Arsenal 2-1 Chelsea at the Emirates", "Verstappen wins in Austin", "Arsenal 2-1 Chelsea at the Emirates"]
+    assert find_duplicate_groups(texts) == [[0, 2], [1]]
+
+
+def test_find_duplicate_groups_handles_text_without_key_terms():
+    assert find_duplicate_groups(["", "all lower case words", ""]) == [[0], [1], [2]]
+
+
+def test_key_terms_skip_sentence_starters_and_keep_scores():
+    assert key_terms("The Gunners won 2-1. After that, Saka said") == key_terms("gunners 2-1 saka Gunners Saka")
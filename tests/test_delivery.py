@@ -0,0 +1,60 @@
+import smtplib
+
+from delivery import SMTPConnectionPool, load_subscribers
+
+
+def test_from_environment_reads_the_current_environment(monkeypatch):
+    monkeypatch.setenv("SMTP_SERVER", "smtp.reloaded.example")
+    monkeypatch.setenv("SMTP_PORT", "587")
+    monkeypatch.setenv("SMTP_USE_SSL", "false")
+    monkeypatch.setenv("SMTP_TIMEOUT", "5")
+    monkeypatch.setenv("MAX_MESSAGES_PER_CONNECTION", "7")
+
+    pool = SMTPConnectionPool.from_environment()
+    assert (pool.host, pool.port, pool.use_ssl, pool.timeout, pool.max_messages) == (
+        "smtp.reloaded.example", 587, False, 5.0, 7,
+    )
+
+
+class RecordingSMTP:
+    def __init__(self, host, port, timeout=None):
+        self.calls = []
+
+    def ehlo(self):
+        self.calls.append("ehlo")
+
+    def starttls(self, context=None):
+        self.calls.append("starttls")
+
+    def login(self, username, password):
+        self.calls.append("login")
+
+    def close(self):
+        pass
+
+
+def test_plain_connection_is_upgraded_before_login(monkeypatch):
+    monkeypatch.setattr(smtplib, "SMTP", RecordingSMTP)
+    server = SMTPConnectionPool(host="localhost", port=587, use_ssl=False, auth=True, username="u", password="p")._connect()
+    assert server.calls == ["ehlo", "starttls", "ehlo", "login"]
+
+    server = SMTPConnectionPool(host="localhost", port=25, use_ssl=False, auth=False)._connect()
+    assert server.calls == []
+
+
+def test_load_subscribers_reads_preferences_and_timezone(tmp_path):
+    source = tmp_path / "subscribers.csv"
+    source.write_text(
+        "email,name,preferences,timezone\n"
+        "# comment\n"
+        "fan@example.com,Sam,football;arsenal,Europe/London\n"
+        "plain@example.com\n",
+        encoding="utf-8",
+    )
+    assert load_subscribers(str(source)) == [
+        {"email": "fan@example.com", "name": "Sam", "preferences": "football;arsenal", "timezone": "Europe/London"},
+        {"email": "plain@example.com", "name": "", "preferences": "", "timezone": ""},
+    ]
+    assert load_subscribers(None, fallback="a@example.com, b@example.com") == [
+        {"email": "a@example.com"}, {"email": "b@example.com"},
+    ]
@@ -0,0 +1,33 @@
+from html_text import extract_text_fast, html_to_text
+
+
+def test_block_tags_become_paragraphs():
+    assert extract_text_fast("<h2>Report</h2><p>First.</p><p>Second <b>bold</b>.</p>") == "Report\n\nFirst.\n\nSecond bold."
+
+
+def test_skip_tags_drop_their_content_only():
+    html = (
+        "<p>Before.</p><figure><img src='x.jpg'><figcaption>Caption</figcaption></figure>"
+        "<script>var x = '<p>not text</p>';</script><aside><p>Related</p></aside><p>After.</p>"
+    )
+    assert extract_text_fast(html) == "Before.\n\nAfter."
+
+
+def test_void_embed_does_not_swallow_the_rest_of_the_article():
+    html = '<p>Intro.</p><embed src="https://example.com/video"><p>The final score was 2-1.</p>'
+    assert extract_text_fast(html) == "Intro.\n\nThe final score was 2-1."
+
+
+def test_void_tags_inside_skipped_elements_keep_the_skip_balanced():
+    html = "<p>One.</p><figure><img src='a.jpg'><source src='b.webm'><br></figure><p>Two.</p>"
+    assert extract_text_fast(html) == "One.\n\nTwo."
+
+
+def test_br_is_a_line_break_and_self_closing_tags_skip_nothing():
+    assert extract_text_fast("<p>Line one<br>line two<br/>line three</p><iframe/><p>Next.</p>") == (
+        "Line one\nline two\nline three\n\nNext."
+    )
+
+
+def test_entities_are_decoded():
+    assert html_to_text("<p>Tom &amp; Jerry&#39;s 3&ndash;1 win</p>", extractor="fast") == "Tom & Jerry's 3–1 win"
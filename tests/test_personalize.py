@@ -0,0 +1,42 @@
+from personalize import EditionAssembler, parse_preferences
+
+POOL = [
+    {"title": "England win the Ashes", "tags": ["Cricket", "England cricket team"]},
+    {"title": "Arsenal beat Chelsea", "tags": ["Football", "Arsenal", "Chelsea"]},
+    {"title": "Verstappen wins in Austin", "tags": ["Formula One", "Max Verstappen"]},
+    {"title": "Arsenal sign new striker", "tags": ["Football", "Arsenal"]},
+    {"title": "Hamilton on pole", "tags": ["Formula One", "Lewis Hamilton"]},
+]
+
+
+def test_parse_preferences_normalizes_and_sorts():
+    assert parse_preferences("Arsenal; lewis  HAMILTON |man-utd;;") == ("arsenal", "lewis hamilton", "man utd")
+    assert parse_preferences("") == ()
+
+
+def test_select_puts_best_matches_first_then_tops_up_with_general_stories():
+    assembler = EditionAssembler(POOL, range(len(POOL)), 3, [0, 1, 2])
+
+    # Both Arsenal stories match both preferences; the rest comes from the general selection
+    assert assembler.select(parse_preferences("arsenal;football")) == (1, 3, 0)
+    # A phrase that isn't a tag matches articles containing all its words
+    assert assembler.select(parse_preferences("lewis hamilton")) == (4, 0, 1)
+
+
+def test_select_without_preferences_is_the_general_edition():
+    assembler = EditionAssembler(POOL, range(len(POOL)), 3, [2, 0, 1])
+    assert assembler.select(()) == (2, 0, 1)
+
+
+def test_select_skips_stories_without_a_summary():
+    # Position 1 never got summarized (e.g. it missed the edition deadline)
+    assembler = EditionAssembler(POOL, [0, 2, 3, 4], 2, [0, 1, 2])
+    assert assembler.select(parse_preferences("arsenal")) == (3, 0)
+    assert assembler.select(()) == (0, 2)
+
+
+def test_select_is_cached_per_assembler():
+    assembler = EditionAssembler(POOL, range(len(POOL)), 2, [0, 1])
+    first = assembler.select(("cricket",))
+    assert assembler.select(("cricket",)) is first
+    assert EditionAssembler(POOL, [1, 2], 2, [1]).select(("cricket",)) == (1,)
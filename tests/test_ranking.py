@@ -0,0 +1,35 @@
+from ranking import parse_interest_terms, query_term_counts, ranking_text, select_top_articles
+
+
+def test_parse_interest_terms_keeps_phrases_and_weights():
+    assert parse_interest_terms("Football:2, formula one ,cricket,football") == {
+        "football": 3.0, "formula one": 1.0, "cricket": 1.0,
+    }
+
+
+def test_parse_interest_terms_skips_empty_entries():
+    assert parse_interest_terms(",, ,golf:0.5") == {"golf": 0.5}
+
+
+def test_query_term_counts_counts_adjacent_repeats():
+    text = ranking_text({"title": "Arsenal", "text": "arsenal arsenal"})
+    # Two words of body text plus the title repeated TITLE_WEIGHT times, back to back
+    assert text.split().count("arsenal") == 5
+    assert query_term_counts([text], ["arsenal"]).tolist() == [[5.0]]
+
+
+def test_query_term_counts_matches_whole_words_and_phrases_only():
+    texts = [
+        ranking_text({"title": "", "text": "Formula One: one lap to go"}),
+        ranking_text({"title": "", "text": "One formula for success in the one-day game"}),
+    ]
+    counts = query_term_counts(texts, ["formula one", "one", "on"])
+    assert counts.tolist() == [[1.0, 2.0, 0.0], [0.0, 2.0, 0.0]]
+
+
+def test_phrase_terms_do_not_boost_articles_that_only_share_a_word():
+    articles = [
+        {"title": "One to watch", "text": "one day one night one more time in the one-day series"},
+        {"title": "Formula One", "text": "formula one title race heads to Austin"},
+    ]
+    assert select_top_articles(articles, 1, interest_terms="formula one") == [articles[1]]
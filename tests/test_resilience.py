@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+
+from resilience import (CircuitBreaker, CircuitOpenError, Deadline, DeadlineExceeded, Hedger, current_deadline,
+                        edition_deadline)
+
+
+def fail(error):
+    def func():
+        raise error
+    return func
+
+
+def test_breaker_opens_after_threshold_and_closes_after_a_good_trial():
+    breaker = CircuitBreaker("Test", failure_threshold=2, reset_seconds=0.05)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail(ConnectionError()))
+
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "never called")
+
+    time.sleep(0.06)
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.opened_at is None and breaker.failures == 0
+
+
+def test_breaker_failed_trial_reopens_at_once():
+    breaker = CircuitBreaker("Test", failure_threshold=1, reset_seconds=0.05)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail(ConnectionError()))
+    time.sleep(0.06)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail(ConnectionError()))
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+
+
+def test_breaker_ignores_deadlines_and_errors_that_are_not_failures():
+    breaker = CircuitBreaker("Test", failure_threshold=1, is_failure=lambda error: isinstance(error, ConnectionError))
+    with pytest.raises(DeadlineExceeded):
+        breaker.call(fail(DeadlineExceeded()))
+    with pytest.raises(ValueError):
+        breaker.call(fail(ValueError()))
+    assert breaker.opened_at is None
+    assert breaker.call(lambda: "ok") == "ok"
+
+
+def primed_hedger(**kwargs):
+    hedger = Hedger("test", percentile=95, min_samples=5, enabled=True, **kwargs)
+    hedger.latencies.extend([0.01] * 5)
+    return hedger
+
+
+def test_hedger_returns_the_backup_when_the_first_call_straggles():
+    calls = []
+    lock = threading.Lock()
+
+    def func():
+        with lock:
+            calls.append(len(calls))
+            first = len(calls) == 1
+        if first:
+            time.sleep(0.5)
+            return "slow"
+        return "fast"
+
+    hedger = primed_hedger(max_ratio=1.0)
+    assert hedger.call(func) == "fast"
+    assert len(calls) == 2 and hedger.hedges == 1
+
+
+def test_hedger_gives_the_budget_back_when_admit_refuses():
+    hedger = primed_hedger(max_ratio=1.0)
+
+    def slow():
+        time.sleep(0.05)
+        return "done"
+
+    assert hedger.call(slow, admit=lambda: False) == "done"
+    assert hedger.hedges == 0
+
+
+def test_hedger_respects_max_ratio():
+    hedger = primed_hedger(max_ratio=0.0)
+    started = []
+
+    def slow():
+        started.append(1)
+        time.sleep(0.05)
+        return "done"
+
+    assert hedger.call(slow) == "done"
+    assert len(started) == 1
+
+
+def test_hedger_raises_the_first_error_when_every_copy_fails():
+    hedger = primed_hedger(max_ratio=1.0)
+    with pytest.raises(KeyError):
+        hedger.call(fail(KeyError("first")))
+
+
+def test_deadline_timeout_is_cut_short_and_then_raises():
+    deadline = Deadline(0.05)
+    assert deadline.timeout(30) <= 0.05
+    time.sleep(0.06)
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout(30)
+    assert Deadline().timeout(30) == 30
+
+
+def test_edition_deadline_is_restored_afterwards():
+    outer = current_deadline()
+    with edition_deadline(10) as deadline:
+        assert current_deadline() is deadline
+        assert deadline.remaining() <= 10
+    assert current_deadline() is outer
@@ -0,0 +1,77 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import APITimeoutError
+
+import summarizer
+from resilience import DeadlineExceeded, edition_deadline
+
+
+def client_with(create):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def reply(content="A summary."):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+@pytest.fixture
+def fresh_breaker(monkeypatch):
+    breaker = summarizer.CircuitBreaker("OpenAI", failure_threshold=1, is_failure=summarizer.is_openai_outage)
+    monkeypatch.setattr(summarizer, "llm_breaker", breaker)
+    monkeypatch.setattr(summarizer.openai_hedger, "enabled", False)
+    return breaker
+
+
+def test_deadline_shortened_timeout_does_not_open_the_breaker(monkeypatch, fresh_breaker):
+    def create(timeout, **kwargs):
+        assert timeout < summarizer.OPENAI_TIMEOUT
+        raise APITimeoutError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+
+    monkeypatch.setattr(summarizer, "_client", client_with(create))
+    with edition_deadline(1.0), pytest.raises(DeadlineExceeded):
+        summarizer.create_completion([{"role": "user", "content": "hi"}], max_tokens=10)
+    assert fresh_breaker.opened_at is None
+
+
+def test_full_length_timeout_still_counts_as_an_outage(monkeypatch, fresh_breaker):
+    def create(timeout, **kwargs):
+        raise APITimeoutError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+
+    monkeypatch.setattr(summarizer, "_client", client_with(create))
+    monkeypatch.setattr(summarizer, "OPENAI_MAX_RETRIES", 0)
+    with pytest.raises(APITimeoutError):
+        summarizer.create_completion([{"role": "user", "content": "hi"}], max_tokens=10)
+    assert fresh_breaker.opened_at is not None
+
+
+def test_requests_in_flight_never_exceed_the_worker_cap(monkeypatch, fresh_breaker):
+    lock = threading.Lock()
+    in_flight = [0, 0] # current, peak
+
+    def create(**kwargs):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+        time.sleep(0.02)
+        with lock:
+            in_flight[0] -= 1
+        return reply()
+
+    monkeypatch.setattr(summarizer, "_client", client_with(create))
+    monkeypatch.setattr(summarizer, "SUMMARY_MAX_INPUT_TOKENS", 50)
+    # Every article is long enough to fan out into several chunk requests
+    articles = [{"title": f"t{i}", "url": "#", "text": f"Article {i}. " + "Lots of words here. " * 60}
+                for i in range(summarizer.SUMMARY_MAX_WORKERS)]
+
+    summaries = summarizer.summarize_articles(articles)
+    assert [summary["summary"] for summary in summaries] == ["A summary."] * len(articles)
+    assert in_flight[1] <= summarizer.SUMMARY_MAX_WORKERS
+
+
+def test_batched_summaries_are_keyed_on_the_batch_prompt():
+    text = "Arsenal beat Chelsea 2-1 at the Emirates."
+    assert summarizer.summary_cache_key(text, batched=True) != summarizer.summary_cache_key(text)
@@ -0,0 +1,28 @@
+from tokens import count_tokens, split_into_chunks
+
+
+def test_short_text_is_one_chunk():
+    assert split_into_chunks("Just one short paragraph.", 100) == ["Just one short paragraph."]
+
+
+def test_paragraphs_are_packed_without_exceeding_the_limit():
+    paragraphs = [f"Paragraph {i} " + "word " * 30 for i in range(10)]
+    chunks = split_into_chunks("\n\n".join(paragraphs), 100)
+
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 100 for chunk in chunks)
+    # Nothing is lost or reordered, and paragraphs are never split when they fit
+    assert [p.strip() for chunk in chunks for p in chunk.split("\n\n")] == [p.strip() for p in paragraphs]
+
+
+def test_long_paragraph_is_split_on_sentences_then_cut():
+    sentence = "The match went to extra time. "
+    run_on = "x" * 2000
+    chunks = split_into_chunks(sentence * 40 + run_on, 50)
+
+    assert all(count_tokens(chunk) <= 50 for chunk in chunks)
+    assert "".join(chunks).replace("\n\n", "").replace(" ", "") == (sentence * 40 + run_on).replace(" ", "")
+
+
+def test_blank_input_gives_no_chunks():
+    assert split_into_chunks("\n\n  \n\n", 10) == []
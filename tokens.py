@@ -0,0 +1,85 @@
+import re
+
+# tiktoken gives exact counts for OpenAI models; without it we fall back to a rough estimate
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+CHARS_PER_TOKEN = 4  # Rough average for English text
+
+_encoding = None
+_UNAVAILABLE = object()  # Remembers a failed load so it isn't retried on every call
+
+
+def get_encoding():
+    """Returns the tiktoken encoding (loaded on first use), or None if tiktoken isn't available."""
+    global _encoding
+    if tiktoken is None or _encoding is _UNAVAILABLE:
+        return None
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # e.g. no network to download the encoding file; stick with estimates for this process
+            print(f"Could not load the tiktoken encoding ({e}); estimating token counts instead.")
+            _encoding = _UNAVAILABLE
+            return None
+    return _encoding
+
+
+def count_tokens(text):
+    """Counts (or estimates) how many tokens 'text' uses."""
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cuts 'text' down to at most max_tokens tokens."""
+    encoding = get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens])
+    return text[:max_tokens * CHARS_PER_TOKEN]
+
+
+def split_into_chunks(text, max_tokens):
+    """Splits text into chunks of at most max_tokens, breaking on paragraph boundaries where possible.
+
+    Paragraphs that are too long on their own are split on sentences, and as a last resort cut.
+    """
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if count_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            while count_tokens(sentence) > max_tokens:
+                head = truncate_to_tokens(sentence, max_tokens)
+                pieces.append(head)
+                sentence = sentence[len(head):]
+            if sentence.strip():
+                pieces.append(sentence)
+
+    # Greedily pack the pieces back together so each chunk is as full as allowed
+    chunks = []
+    current = []
+    current_tokens = 0
+    for piece in pieces:
+        piece_tokens = count_tokens(piece)
+        if current and current_tokens + piece_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current = []
+            current_tokens = 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks